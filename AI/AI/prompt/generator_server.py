@@ -5,6 +5,11 @@ import time
 import shutil
 import tempfile
 import asyncio
+import itertools
+import mimetypes
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
@@ -12,7 +17,8 @@ from typing import Optional, Dict, Any, Tuple
 import httpx
 import boto3
 from botocore.config import Config as BotoConfig
-from fastapi import FastAPI, Body, HTTPException, BackgroundTasks
+from botocore.exceptions import ClientError
+from fastapi import FastAPI, Body, Header, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -22,15 +28,26 @@ from google.genai import types
 from PIL import Image
 from io import BytesIO
 
+import logs
+import tracing
+
 # =========================
 # generator_server.py 설정 (ComfyUI)
 # =========================
 COMFY_BASE_URL       = os.getenv("COMFY_BASE_URL", "http://127.0.0.1:8188")
-WORKFLOW_YT_PATH     = Path(os.getenv("WORKFLOW_YT_PATH", "./youtube_video.json")).resolve()
-WORKFLOW_REDDIT_PATH = Path(os.getenv("WORKFLOW_REDDIT_PATH", "./reddit_image.json")).resolve()
+# 여러 대일 때: 쉼표로 구분 (없으면 COMFY_BASE_URL 한 대)
+COMFY_BASE_URLS      = [u.strip() for u in os.getenv("COMFY_BASE_URLS", COMFY_BASE_URL).split(",") if u.strip()]
+COMFY_HEALTH_INTERVAL_S = float(os.getenv("COMFY_HEALTH_INTERVAL_S", "5.0"))
+COMFY_HEALTH_FAILS   = int(os.getenv("COMFY_HEALTH_FAILS", "3"))   # 연속 실패 N회면 drain
+WORKFLOW_CONFIG_PATH = Path(os.getenv("WORKFLOW_CONFIG_PATH", Path(__file__).with_name("workflows.json"))).resolve()
 GEN_BRIDGE_CALLBACK  = os.getenv("BRIDGE_CALLBACK_URL", "http://127.0.0.1:8001/api/media/callback")
 POLL_INTERVAL        = float(os.getenv("POLL_INTERVAL", "2.0"))
-OUTPUT_DIR           = r"D:\ComfyUI\ComfyUI\output"
+COMFY_WS_ENABLED     = os.getenv("COMFY_WS", "1") != "0"
+COMFY_WS_RECONNECT_S = float(os.getenv("COMFY_WS_RECONNECT_S", "3.0"))
+# 결과물 전달 방식: local(LOCAL_OUTPUT_DIR로 스트리밍) | s3(이미지는 S3_IMAGE_BUCKET, 영상은 S3_VIDEO_BUCKET 멀티파트) | none(파일명만 전달)
+COMFY_OUTPUT_SINK    = os.getenv("COMFY_OUTPUT_SINK", "local")
+COMFY_OUTPUT_PREFIX  = os.getenv("COMFY_OUTPUT_PREFIX", "")
+VIEW_CHUNK_SIZE      = 1024 * 1024
 
 class GenInComfy(BaseModel):
     requestId: str
@@ -40,41 +57,439 @@ class GenInComfy(BaseModel):
     platform: str   # youtube | reddit
     isclient: Optional[bool] = False
 
-async def _submit_to_comfy(patched_workflow: Dict[str, Any]) -> str:
-    client_id = uuid.uuid4().hex
-    payload = {"client_id": client_id, "prompt": patched_workflow}
-    async with httpx.AsyncClient(timeout=300) as cli:
-        r = await cli.post(f"{COMFY_BASE_URL}/prompt", json=payload)
-        r.raise_for_status()
-        data = r.json()
-    return data.get("prompt_id") or data.get("promptId") or ""
-
-async def _wait_for_history_and_get_output(prompt_id: str, ext: str, timeout: int, start_time: datetime) -> Optional[str]:
-    deadline = asyncio.get_event_loop().time() + timeout
-    async with httpx.AsyncClient(timeout=30) as cli:
-        while asyncio.get_event_loop().time() < deadline:
-            r = await cli.get(f"{COMFY_BASE_URL}/history/{prompt_id}")
-            if r.status_code == 200:
-                hist = r.json()
-                for _, v in hist.items():
-                    status_info = v.get("status", {})
-                    if status_info.get("status_str") == "failed":
-                        raise RuntimeError("ComfyUI execution failed")
-                    if status_info.get("status_str") == "success" and status_info.get("completed"):
-                        outputs = v.get("outputs", {})
-                        for _, node_out in outputs.items():
-                            if "images" in node_out:
-                                for img in node_out["images"]:
-                                    fn = img.get("filename")
-                                    if fn and fn.lower().endswith(ext):
-                                        full_path = os.path.join(OUTPUT_DIR, fn)
-                                        if os.path.exists(full_path):
-                                            mtime = datetime.fromtimestamp(os.path.getmtime(full_path))
-                                            if mtime > start_time:
-                                                return fn
+class WorkflowTemplate:
+    """플랫폼 하나의 워크플로우 템플릿 + 미리 계산한 패치 계획.
+
+    plan: 논리 입력(image/positive/negative) → [(node_id, field), ...]
+    class_type 규칙은 로드 시점에 node_id로 풀어 두므로 요청마다 노드 전체를 훑지 않는다.
+    """
+
+    def __init__(self, platform: str, spec: Dict[str, Any], base_dir: Path):
+        self.platform = platform
+        env_path = os.getenv(spec.get("path_env") or "")
+        self.path = Path(env_path).resolve() if env_path else (base_dir / spec["path"]).resolve()
+        self.ext = spec.get("ext", ".png")
+        self.timeout = int(spec.get("timeout", 300))
+        self._rules: Dict[str, list] = spec.get("inputs") or {}
+        self._mtime = -1.0
+        self.nodes: Dict[str, Any] = {}
+        self.plan: Dict[str, list[tuple[str, str]]] = {}
+
+    def refresh(self) -> None:
+        # mtime이 바뀐 경우에만 다시 읽고 패치 계획을 다시 만든다
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return
+        nodes = json.loads(self.path.read_text(encoding="utf-8"))
+        plan: Dict[str, list[tuple[str, str]]] = {}
+        for name, rules in self._rules.items():
+            targets: list[tuple[str, str]] = []
+            for rule in rules:
+                field = rule["field"]
+                if "node" in rule:
+                    ids = [rule["node"]] if rule["node"] in nodes else []
+                else:
+                    ids = [nid for nid, n in nodes.items()
+                           if isinstance(n, dict) and n.get("class_type") == rule.get("class_type")]
+                targets.extend((nid, field) for nid in ids if (nid, field) not in targets)
+            plan[name] = targets
+        self.nodes, self.plan, self._mtime = nodes, plan, mtime
+        logs.info("workflow_loaded", platform=self.platform, path=str(self.path))
+
+    def build(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        # 구조적 복사: 패치하는 노드와 그 inputs만 새 dict, 나머지 노드는 템플릿 객체를 공유(읽기 전용)
+        self.refresh()
+        wf = dict(self.nodes)
+        for name, value in values.items():
+            for nid, field in self.plan.get(name, ()):
+                node = wf[nid]
+                if node is self.nodes[nid]:
+                    node = wf[nid] = {**node, "inputs": dict(node.get("inputs") or {})}
+                node["inputs"][field] = value
+        return wf
+
+class WorkflowRegistry:
+    """workflows.json(플랫폼 → 템플릿 경로/확장자/타임아웃/입력 매핑)을 읽어 템플릿을 한 번만 로드.
+    새 플랫폼은 설정 파일에 항목만 추가하면 된다."""
+
+    def __init__(self, config_path: Path):
+        self.config_path = config_path
+        self._config_mtime = -1.0
+        self._templates: Dict[str, WorkflowTemplate] = {}
+
+    def get(self, platform: str) -> Optional[WorkflowTemplate]:
+        mtime = self.config_path.stat().st_mtime
+        if mtime != self._config_mtime:
+            config = json.loads(self.config_path.read_text(encoding="utf-8"))
+            base_dir = self.config_path.parent
+            self._templates = {name: WorkflowTemplate(name, spec, base_dir) for name, spec in config.items()}
+            self._config_mtime = mtime
+        return self._templates.get(platform)
+
+workflows = WorkflowRegistry(WORKFLOW_CONFIG_PATH)
+
+def _history_error(status_info: Dict[str, Any]) -> str:
+    # history status.messages: [["execution_error", {...}], ["execution_interrupted", {...}], ...]
+    for name, data in status_info.get("messages") or []:
+        if name == "execution_error":
+            return (data or {}).get("exception_message") or (data or {}).get("node_type") or ""
+        if name == "execution_interrupted":
+            return "interrupted"
+    return ""
+
+class ComfyBackend:
+    """ComfyUI 한 대와의 연결.
+
+    공유 WebSocket(/ws?clientId=) 하나로 완료/에러 이벤트를 받아 prompt_id별 대기 Future를 깨운다.
+    ComfyUI는 실행 이벤트를 제출한 client_id의 소켓으로만 보내므로 제출도 같은 client_id로 한다.
+    소켓이 끊겨 있거나 새 대기자가 생기면, 공유 poller 하나가 주기마다 bulk GET /history 한 번으로
+    모든 대기 prompt를 확인한다 → 대기 잡 수와 무관하게 ComfyUI 요청 수는 일정.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.client_id = uuid.uuid4().hex
+        self.ws_connected = False
+        # 부하/상태: queue_remaining은 WS status 이벤트나 health check(/queue)로 갱신
+        self.queue_remaining = 0
+        self.submitting = 0   # /prompt POST 진행 중 (아직 queue_remaining/_waiters에 안 잡힌 몫)
+        self.healthy = True
+        self._health_fails = 0
+        # 다음 poll 주기에 bulk /history 확인이 필요한지 (새 대기자 등록, 소켓 재연결 시)
+        self._poll_dirty = False
+        self._bg: set[asyncio.Task] = set()
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._finishing: set[str] = set()   # 완료 이벤트로 /history 조회를 이미 시작한 prompt
+        self._http: Optional[httpx.AsyncClient] = None
+        self._ws_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._http = httpx.AsyncClient(timeout=30)
+        if COMFY_WS_ENABLED:
+            self._ws_task = asyncio.create_task(self._ws_loop())
+        self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._ws_task, self._poll_task) if t]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._http:
+            await self._http.aclose()
+
+    @property
+    def load(self) -> int:
+        # status 이벤트 사이에 몰린 제출도 반영되도록 내가 기다리는 prompt 수와 큰 쪽 + POST 중인 몫
+        return max(self.queue_remaining, len(self._waiters)) + self.submitting
+
+    async def submit(self, patched_workflow: Dict[str, Any], front: bool = False) -> str:
+        payload = {"client_id": self.client_id, "prompt": patched_workflow}
+        if front:
+            payload["front"] = True   # 우선 레인: 대기열 맨 앞에 넣음
+        # 첫 await 전에 올려 둬야 동시에 pick()하는 요청들이 이 몫을 본다
+        self.submitting += 1
+        try:
+            r = await self._http.post(f"{self.base_url}/prompt", json=payload, timeout=300)
+            r.raise_for_status()
+            data = r.json()
+            self.queue_remaining += 1   # 다음 status 이벤트 전까지의 추정치 (submitting에서 넘겨받음)
+            return data.get("prompt_id") or data.get("promptId") or ""
+        finally:
+            self.submitting -= 1
+
+    async def check_health(self) -> bool:
+        # GET /queue: 응답하면 실행 중 + 대기 수로 queue_remaining 갱신, 연속 실패면 drain
+        try:
+            r = await self._http.get(f"{self.base_url}/queue", timeout=5)
+            r.raise_for_status()
+            q = r.json()
+            self.queue_remaining = len(q.get("queue_running") or []) + len(q.get("queue_pending") or [])
+            ok = True
+        except Exception as e:
+            logs.warning("comfy_health_fail", str(e), backend=self.base_url)
+            ok = False
+        self.mark(ok)
+        return ok
+
+    def mark(self, ok: bool) -> None:
+        if ok:
+            if not self.healthy:
+                logs.info("comfy_recovered", backend=self.base_url)
+            self._health_fails = 0
+            self.healthy = True
+            return
+        self._health_fails += 1
+        if self.healthy and self._health_fails >= COMFY_HEALTH_FAILS:
+            self.healthy = False
+            logs.warning("comfy_drained", backend=self.base_url, failures=self._health_fails)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"baseUrl": self.base_url, "healthy": self.healthy, "wsConnected": self.ws_connected,
+                "queueRemaining": self.queue_remaining, "waiting": len(self._waiters),
+                "submitting": self.submitting}
+
+    async def cancel(self, prompt_id: str) -> bool:
+        """prompt 하나만 취소: 대기 중이면 /queue에서 삭제, 실행 중이면 그 prompt_id만 interrupt.
+        다른 고객의 잡은 건드리지 않는다."""
+        try:
+            r = await self._http.get(f"{self.base_url}/queue", timeout=10)
+            r.raise_for_status()
+            q = r.json()
+            pending = {item[1] for item in q.get("queue_pending") or []}
+            running = {item[1] for item in q.get("queue_running") or []}
+            if prompt_id in pending:
+                r = await self._http.post(f"{self.base_url}/queue", json={"delete": [prompt_id]})
+            elif prompt_id in running:
+                r = await self._http.post(f"{self.base_url}/interrupt", json={"prompt_id": prompt_id})
+            else:
+                return False   # 이미 끝났거나 모르는 prompt
+            r.raise_for_status()
+            return True
+        except Exception as e:
+            logs.error("comfy_cancel_fail", str(e), backend=self.base_url, promptId=prompt_id)
+            return False
+
+    def stream_view(self, item: Dict[str, Any]):
+        # history outputs 항목(filename/subfolder/type) 그대로 /view 로 요청 → 디스크 공유 불필요
+        params = {"filename": item["filename"], "subfolder": item.get("subfolder", ""),
+                  "type": item.get("type", "output")}
+        return self._http.stream("GET", f"{self.base_url}/view", params=params, timeout=300)
+
+    async def fetch_history(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        r = await self._http.get(f"{self.base_url}/history/{prompt_id}")
+        if r.status_code != 200:
+            return None
+        return r.json().get(prompt_id)
+
+    async def wait(self, prompt_id: str, timeout: float) -> Dict[str, Any]:
+        """prompt가 끝나면 history 항목을 돌려준다. 실패면 RuntimeError, 시간 초과면 TimeoutError."""
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[prompt_id] = fut
+        # 등록 전에 완료 이벤트가 지나갔을 수 있으므로 다음 poll 주기에 한 번 확인
+        self._poll_dirty = True
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._waiters.pop(prompt_id, None)
+            self._finishing.discard(prompt_id)
+
+    async def _poll_loop(self) -> None:
+        while True:
             await asyncio.sleep(POLL_INTERVAL)
+            if not self._waiters or (self.ws_connected and not self._poll_dirty):
+                continue
+            self._poll_dirty = False
+            try:
+                # 최근 항목만: 대기 중인 prompt 수보다 넉넉하게
+                r = await self._http.get(f"{self.base_url}/history",
+                                         params={"max_items": max(64, 2 * len(self._waiters))})
+                r.raise_for_status()
+                hist = r.json()
+            except Exception as e:
+                logs.warning("comfy_poll_fail", str(e), backend=self.base_url)
+                continue
+            for prompt_id in list(self._waiters):
+                self._resolve_from_history(prompt_id, hist.get(prompt_id))
+
+    def _resolve_from_history(self, prompt_id: str, entry: Optional[Dict[str, Any]]) -> None:
+        fut = self._waiters.get(prompt_id)
+        if fut is None or fut.done() or not entry:
+            return
+        status_info = entry.get("status", {})
+        # ComfyUI는 실패/interrupt 모두 status_str "error", completed False 로 남긴다
+        if status_info.get("status_str") == "error" or status_info.get("completed") is False:
+            fut.set_exception(RuntimeError(f"ComfyUI execution failed: {_history_error(status_info)}".strip()))
+        elif status_info.get("completed"):
+            fut.set_result(entry)
+
+    async def _ws_loop(self) -> None:
+        import websockets
+
+        ws_url = self.base_url.replace("http", "ws", 1) + f"/ws?clientId={self.client_id}"
+        while True:
+            try:
+                async with websockets.connect(ws_url, max_size=None) as ws:
+                    self.ws_connected = True
+                    self._poll_dirty = True   # 끊긴 동안 놓친 완료 보정
+                    logs.info("comfy_ws_connected", url=ws_url)
+                    async for msg in ws:
+                        if isinstance(msg, bytes):   # 미리보기 이미지 프레임
+                            continue
+                        self._on_event(json.loads(msg))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logs.warning("comfy_ws_disconnected", f"{e}; fallback to /history polling", backend=self.base_url)
+            finally:
+                self.ws_connected = False
+            await asyncio.sleep(COMFY_WS_RECONNECT_S)
+
+    def _on_event(self, evt: Dict[str, Any]) -> None:
+        etype = evt.get("type")
+        data = evt.get("data") or {}
+        if etype == "status":
+            exec_info = (data.get("status") or {}).get("exec_info") or {}
+            if "queue_remaining" in exec_info:
+                self.queue_remaining = int(exec_info["queue_remaining"])
+            return
+        prompt_id = data.get("prompt_id")
+        fut = self._waiters.get(prompt_id)
+        if fut is None or fut.done():
+            return
+        if etype == "execution_error":
+            fut.set_exception(RuntimeError(
+                f"ComfyUI execution failed: {data.get('exception_message') or data.get('node_type') or ''}".strip()
+            ))
+        elif etype == "execution_interrupted":
+            fut.set_exception(RuntimeError("ComfyUI execution interrupted"))
+        elif etype == "execution_success" or (etype == "executing" and data.get("node") is None):
+            # 출력 목록은 history에 모여 있으므로 완료 시 한 번만 조회 (두 이벤트가 다 오므로 먼저 온 쪽만)
+            if prompt_id in self._finishing:
+                return
+            self._finishing.add(prompt_id)
+            task = asyncio.create_task(self._finish(prompt_id))
+            self._bg.add(task)
+            task.add_done_callback(self._bg.discard)
+
+    async def _finish(self, prompt_id: str) -> None:
+        try:
+            self._resolve_from_history(prompt_id, await self.fetch_history(prompt_id))
+        except Exception as e:
+            logs.warning("comfy_history_fail", str(e), backend=self.base_url, promptId=prompt_id)
+        fut = self._waiters.get(prompt_id)
+        if fut is not None and not fut.done():
+            # 조회 실패/아직 history에 없음 → WS가 붙어 있어도 다음 poll 주기에 bulk /history로 확인
+            self._poll_dirty = True
+
+class ComfyPool:
+    """ComfyUI 여러 대에 대한 least-loaded 분배.
+
+    제출할 때마다 healthy 백엔드 중 load가 가장 작은 곳을 고르고, 연결 실패면 다음 후보로 넘긴다.
+    health loop가 주기마다 /queue를 찔러 부하를 갱신하고, 연속 실패한 백엔드는 새 제출에서 뺀다(drain).
+    drain된 백엔드의 WS/poller는 그대로 돌려 이미 맡긴 잡의 결과는 계속 받는다.
+    """
+
+    def __init__(self, base_urls: list[str]):
+        self.backends = [ComfyBackend(u) for u in base_urls]
+        self._health_task: Optional[asyncio.Task] = None
+        self._rr = itertools.count()
+
+    def start(self) -> None:
+        for b in self.backends:
+            b.start()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        await asyncio.gather(*(b.stop() for b in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(COMFY_HEALTH_INTERVAL_S)
+            await asyncio.gather(*(b.check_health() for b in self.backends))
+
+    def pick(self, exclude: Tuple[ComfyBackend, ...] = ()) -> Optional[ComfyBackend]:
+        candidates = [b for b in self.backends if b not in exclude]
+        # 전부 drain 상태면 그래도 한 번은 시도해 본다
+        healthy = [b for b in candidates if b.healthy] or candidates
+        if not healthy:
+            return None
+        # 부하가 같으면 라운드로빈 (항상 앞 백엔드로 몰리지 않도록)
+        least = min(b.load for b in healthy)
+        tied = [b for b in healthy if b.load == least]
+        return tied[next(self._rr) % len(tied)]
+
+    async def submit(self, patched_workflow: Dict[str, Any], front: bool = False) -> Tuple[ComfyBackend, str]:
+        tried: Tuple[ComfyBackend, ...] = ()
+        while True:
+            backend = self.pick(tried)
+            if backend is None:
+                raise RuntimeError("no ComfyUI backend available")
+            try:
+                return backend, await backend.submit(patched_workflow, front)
+            except httpx.TransportError as e:
+                # 연결/전송 실패만 다른 백엔드로 넘김 (4xx/5xx는 워크플로우 문제일 수 있으므로 그대로 실패)
+                logs.warning("comfy_lb_submit_fail", str(e), backend=backend.base_url)
+                backend.mark(False)
+                tried += (backend,)
+
+    def stats(self) -> list[Dict[str, Any]]:
+        return [b.stats() for b in self.backends]
+
+comfy = ComfyPool(COMFY_BASE_URLS)
+
+async def _submit_to_comfy(patched_workflow: Dict[str, Any], front: bool = False) -> Tuple[ComfyBackend, str]:
+    return await comfy.submit(patched_workflow, front)
+
+# jobId → (백엔드, prompt_id, 결과 대기 task). 클라이언트 재요청 시 교체 대상 찾기용
+_active_prompts: Dict[int, Tuple[ComfyBackend, str, asyncio.Task]] = {}
+
+def _pick_output(entry: Dict[str, Any], ext: str) -> Optional[Dict[str, Any]]:
+    for _, node_out in (entry.get("outputs") or {}).items():
+        for kind in ("images", "gifs", "videos"):
+            for item in node_out.get(kind) or []:
+                fn = item.get("filename")
+                if fn and fn.lower().endswith(ext) and item.get("type", "output") == "output":
+                    return item
     return None
 
+def _output_bucket(fn: str, ctype: str) -> str:
+    # content-type이 없거나 octet-stream이면 확장자로 판단
+    if not ctype or ctype == "application/octet-stream":
+        ctype = mimetypes.guess_type(fn)[0] or ""
+    return S3_IMAGE_BUCKET if ctype.startswith("image/") else S3_VIDEO_BUCKET
+
+async def _store_output(backend: "ComfyBackend", item: Dict[str, Any]) -> str:
+    """/view 응답을 청크 단위로 목적지에 바로 흘려보낸다(전체를 메모리에 올리지 않음). resultKey 반환."""
+    fn = item["filename"]
+    if COMFY_OUTPUT_SINK == "none":
+        return fn
+    async with backend.stream_view(item) as resp:
+        resp.raise_for_status()
+        if COMFY_OUTPUT_SINK == "s3":
+            key = _join_key(COMFY_OUTPUT_PREFIX, fn)
+            ctype = (resp.headers.get("content-type") or "").split(";")[0].strip()
+            bucket = _output_bucket(fn, ctype)
+            async with S3MultipartWriter(bucket, key, ctype or "application/octet-stream") as w:
+                async for chunk in resp.aiter_bytes(VIEW_CHUNK_SIZE):
+                    await w.write(chunk)
+            return key
+        final_path = os.path.join(LOCAL_OUTPUT_DIR, fn)
+        tmp_path = final_path + ".part"
+        # 파일 열기/쓰기/rename 모두 스레드에서: 느린 디스크가 이벤트 루프를 막지 않도록
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in resp.aiter_bytes(VIEW_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, tmp_path, final_path)
+        except BaseException:
+            # 중간에 끊기면 .part가 남지 않게 정리
+            f.close()
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return fn
+
+async def _wait_for_history_and_get_output(backend: ComfyBackend, prompt_id: str,
+                                           ext: str, timeout: int) -> Optional[str]:
+    # 결과는 그 잡을 실행한 백엔드에서 받는다
+    try:
+        with tracing.span("generator.comfy_wait", backend=backend.base_url, promptId=prompt_id):
+            entry = await backend.wait(prompt_id, timeout)
+    except asyncio.TimeoutError:
+        return None
+    item = _pick_output(entry, ext)
+    if item is None:
+        return None
+    with tracing.span("generator.store_output", sink=COMFY_OUTPUT_SINK):
+        return await _store_output(backend, item)
+
 async def _callback_bridge(payload: GenInComfy,
                            status: str,
                            message: str,
@@ -96,22 +511,22 @@ async def _callback_bridge(payload: GenInComfy,
         "type": mapped_type,
         "createdAt": datetime.now().isoformat()
     }
-    async with httpx.AsyncClient(timeout=30) as cli:
-        try:
-            await cli.post(GEN_BRIDGE_CALLBACK, json=cb)
-        except Exception as e:
-            print(f"[ERROR] Callback 전송 실패: {e}")
+    with tracing.span("generator.callback", status=status):
+        async with httpx.AsyncClient(timeout=30) as cli:
+            try:
+                await cli.post(GEN_BRIDGE_CALLBACK, json=cb, headers=tracing.inject())
+            except Exception as e:
+                logs.error("callback_fail", str(e), requestId=cb["requestId"], status=status)
 
-async def _interrupt_comfy() -> bool:
-    async with httpx.AsyncClient(timeout=30) as cli:
-        try:
-            r = await cli.post(f"{COMFY_BASE_URL}/interrupt")
-            r.raise_for_status()
-            data = r.json() if r.headers.get("content-type","").startswith("application/json") else {}
-            return data.get("interrupted", False)
-        except Exception as e:
-            print(f"[ERROR] ComfyUI interrupt 실패: {e}")
-            return False
+async def _cancel_replaced(payload: GenInComfy) -> None:
+    # 같은 jobId로 돌고 있던 이전 prompt만 취소하고 그 건은 FAILED로 콜백
+    prev = _active_prompts.pop(payload.jobId, None)
+    if prev is None:
+        return
+    backend, prompt_id, task = prev
+    task.cancel()
+    if await backend.cancel(prompt_id):
+        logs.info("comfy_cancelled", "replaced by client request", backend=backend.base_url, promptId=prompt_id)
 
 # =========================
 # veo3_server.py 설정 (Gemini+Veo3)
@@ -193,8 +608,97 @@ def parse_s3_uri_or_key(img: str) -> tuple[str, str]:
     key = img.lstrip("/")
     return S3_IMAGE_BUCKET, key
 
+# =========================
+# 원본 이미지 캐시
+# =========================
+IMAGE_CACHE_MB      = int(os.getenv("IMAGE_CACHE_MB", "256"))       # 0이면 끔
+IMAGE_CACHE_FRESH_S = float(os.getenv("IMAGE_CACHE_FRESH_S", "300"))  # 이 시간 안에는 S3 확인 없이 사용
+
+class SourceImageCache:
+    """최근 쓴 원본 이미지(마스코트 등)를 bucket/key/ETag 기준으로 메모리에 보관하는 LRU.
+
+    IMAGE_CACHE_FRESH_S 안이면 그대로 쓰고, 지나면 get_object(IfNoneMatch=ETag)로 재검증해서
+    304면 본문 없이 재사용한다. 전체 크기는 max_bytes로 제한. to_thread 에서 불리므로 락으로 보호.
+    """
+
+    def __init__(self, max_bytes: int, fresh_s: float):
+        self.max_bytes = max_bytes
+        self.fresh_s = fresh_s
+        # (bucket, key) → (etag, data, content_type, checked_at)
+        self._entries: "OrderedDict[tuple[str, str], tuple[str, bytes, str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, bucket: str, key: str) -> tuple[bytes, str]:
+        with self._lock:
+            cached = self._entries.get((bucket, key))
+            if cached is not None:
+                self._entries.move_to_end((bucket, key))
+        now = time.monotonic()
+        if cached is not None and now - cached[3] < self.fresh_s:
+            with self._lock:
+                self.hits += 1
+            return cached[1], cached[2]
+
+        params = {"Bucket": bucket, "Key": key}
+        if cached is not None:
+            params["IfNoneMatch"] = cached[0]
+        try:
+            obj = s3_client.get_object(**params)
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if cached is None or (status != 304 and e.response.get("Error", {}).get("Code") not in ("304", "NotModified")):
+                raise
+            with self._lock:
+                self.revalidated += 1
+                if (bucket, key) in self._entries:
+                    self._entries[(bucket, key)] = (*cached[:3], now)
+            return cached[1], cached[2]
+
+        data = obj["Body"].read()
+        ctype = obj.get("ContentType") or "image/jpeg"
+        with self._lock:
+            self.misses += 1
+            self._put((bucket, key), (obj.get("ETag") or "", data, ctype, now))
+        return data, ctype
+
+    def _put(self, k: tuple[str, str], entry: tuple[str, bytes, str, float]) -> None:
+        old = self._entries.pop(k, None)
+        if old is not None:
+            self._bytes -= len(old[1])
+        if len(entry[1]) > self.max_bytes:
+            return
+        self._entries[k] = entry
+        self._bytes += len(entry[1])
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted[1])
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.revalidated + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round((self.hits + self.revalidated) / total, 4) if total else 0.0,
+            }
+
+image_cache = SourceImageCache(IMAGE_CACHE_MB * 1024 * 1024, IMAGE_CACHE_FRESH_S) if IMAGE_CACHE_MB > 0 else None
+
 def fetch_image_bytes_from_s3(img: str) -> tuple[bytes, str]:
     bucket, key = parse_s3_uri_or_key(img)
+    if image_cache is not None:
+        return image_cache.get(bucket, key)
     obj = s3_client.get_object(Bucket=bucket, Key=key)
     ctype = obj.get("ContentType") or "image/jpeg"
     data = obj["Body"].read()
@@ -211,86 +715,402 @@ def upload_video_to_s3(local_path: str, dest_bucket: str, dest_key: str) -> str:
     )
     return url
 
-def post_callback(payload: dict):
-    with httpx.Client(timeout=15) as cli:
-        cli.post(CALLBACK_URL, json=payload)
+# =========================
+# S3 스트리밍 업로드
+# =========================
+S3_PART_SIZE          = max(5, int(os.getenv("S3_PART_SIZE_MB", "16"))) * 1024 * 1024   # S3 최소 5MB
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
 
-def run_generation(job: GenInVeo):
-    event_id = f"evt_{job.requestId}_{uuid.uuid4().hex[:6]}"
-    prompt = job.veoPrompt
+class S3MultipartWriter:
+    """비동기로 들어오는 청크를 S3 멀티파트 업로드로 보낸다.
+
+    메모리에는 최대 part_size * concurrency 만큼만 올라가고, part 업로드는 concurrency 개까지 병렬.
+    part 하나도 안 채워진 작은 파일은 put_object 한 번으로 끝낸다. 예외 시 업로드를 abort.
+    """
+
+    def __init__(self, bucket: str, key: str, content_type: str,
+                 part_size: int = S3_PART_SIZE, concurrency: int = S3_UPLOAD_CONCURRENCY):
+        self.bucket, self.key, self.content_type = bucket, key, content_type
+        self.part_size = part_size
+        self.bytes_written = 0
+        self._buf = bytearray()
+        self._upload_id: Optional[str] = None
+        self._sem = asyncio.Semaphore(concurrency)
+        self._tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "S3MultipartWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            await self.abort()
+            return
+        try:
+            await self.close()
+        except BaseException:
+            # part 업로드/complete 실패도 멀티파트가 남아 저장 공간을 잡지 않도록 abort
+            await self.abort()
+            raise
+
+    async def write(self, data: bytes) -> None:
+        self._buf += data
+        self.bytes_written += len(data)
+        while len(self._buf) >= self.part_size:
+            part = bytes(self._buf[:self.part_size])
+            del self._buf[:self.part_size]
+            await self._submit(part)
+
+    async def _submit(self, part: bytes) -> None:
+        if self._upload_id is None:
+            resp = await asyncio.to_thread(
+                s3_client.create_multipart_upload,
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type,
+            )
+            self._upload_id = resp["UploadId"]
+        await self._sem.acquire()
+        part_number = len(self._tasks) + 1
+
+        async def _upload() -> dict:
+            try:
+                resp = await asyncio.to_thread(
+                    s3_client.upload_part,
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                    PartNumber=part_number, Body=part,
+                )
+                return {"PartNumber": part_number, "ETag": resp["ETag"]}
+            finally:
+                self._sem.release()
+
+        self._tasks.append(asyncio.create_task(_upload()))
+
+    async def close(self) -> None:
+        if self._upload_id is None:
+            await asyncio.to_thread(
+                s3_client.put_object,
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buf), ContentType=self.content_type,
+            )
+            return
+        if self._buf:
+            await self._submit(bytes(self._buf))
+            self._buf.clear()
+        parts = await asyncio.gather(*self._tasks)
+        await asyncio.to_thread(
+            s3_client.complete_multipart_upload,
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+        )
+
+    async def abort(self) -> None:
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    s3_client.abort_multipart_upload,
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                )
+            except Exception as e:
+                logs.error("s3_abort_fail", str(e), bucket=self.bucket, key=self.key)
+
+# =========================
+# Veo 잡 실행기
+# =========================
+VEO_CONCURRENCY = int(os.getenv("VEO_CONCURRENCY", "4"))
+VEO_QUEUE_MAX   = int(os.getenv("VEO_QUEUE_MAX", "32"))   # 넘치면 /api/veo3-generate 가 429
+VEO_MAX_OPERATION_WAIT_S = float(os.getenv("VEO_MAX_OPERATION_WAIT_S", "900"))   # 넘기면 FAILED 콜백 (0=무제한)
+
+async def post_callback(payload: dict):
+    with tracing.span("generator.callback", status=payload.get("status", "")):
+        async with httpx.AsyncClient(timeout=15) as cli:
+            await cli.post(CALLBACK_URL, json=payload, headers=tracing.inject())
+
+class VeoOperationPoller:
+    """진행 중인 Veo operation 전부를 task 하나가 주기마다 client.aio.operations.get 으로 확인.
+    영상 하나당 스레드/루프를 잡아두지 않는다."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._ops: Dict[str, Tuple[Any, asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def pending(self) -> int:
+        return len(self._ops)
+
+    async def wait(self, operation: Any, timeout: Optional[float] = None) -> Any:
+        # timeout(초)을 넘기면 폴링 대상에서 빼고 RuntimeError → 호출자가 FAILED 처리
+        if operation.done:
+            return operation
+        fut = asyncio.get_running_loop().create_future()
+        self._ops[operation.name] = (operation, fut)
+        try:
+            return await asyncio.wait_for(fut, timeout or None)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"veo operation not done after {timeout:g}s") from None
+        finally:
+            self._ops.pop(operation.name, None)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            pending = [(op, fut) for op, fut in self._ops.values() if not fut.done()]
+            if not pending:
+                continue
+            results = await asyncio.gather(*(client.aio.operations.get(op) for op, _ in pending),
+                                           return_exceptions=True)
+            for (op, fut), res in zip(pending, results):
+                if fut.done():
+                    continue
+                if isinstance(res, Exception):
+                    logs.warning("veo_poll_fail", str(res), operation=op.name)
+                    continue   # 다음 주기에 재시도
+                if res.done:
+                    fut.set_result(res)
+                else:
+                    self._ops[op.name] = (res, fut)
+
+class VeoExecutor:
+    """Veo 잡 전용 실행기: 크기 제한 큐 + 워커 VEO_CONCURRENCY개.
+    Starlette 기본 스레드풀(동기 엔드포인트와 공유)을 쓰지 않고, 단계별 소요 시간을 모은다."""
+
+    STAGES = ("fetch", "compose", "submit", "operation", "transfer", "download", "upload", "callback")
+
+    def __init__(self, concurrency: int, queue_max: int):
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max)
+        self.poller = VeoOperationPoller(VEO3_POLL_SEC)
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # 단계 → [횟수, 합계(s), 최대(s)]
+        self._timings: Dict[str, list] = {name: [0, 0.0, 0.0] for name in self.STAGES}
+        self._workers: list[asyncio.Task] = []
+        self._bg: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        self.poller.start()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self.poller.stop()
+
+    def spawn(self, coro) -> None:
+        # 결과를 기다리지 않는 부수 작업 (참조를 잡아 둬야 GC로 사라지지 않음)
+        task = asyncio.create_task(coro)
+        self._bg.add(task)
+        task.add_done_callback(self._bg.discard)
+
+    def submit(self, job: "GenInVeo", trace_ctx: Optional[tracing.SpanContext] = None) -> bool:
+        try:
+            self.queue.put_nowait((job, trace_ctx, time.time_ns()))
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(f"veo.{name}"):
+                yield
+        finally:
+            dt = time.perf_counter() - t0
+            t = self._timings[name]
+            t[0] += 1
+            t[1] += dt
+            t[2] = max(t[2], dt)
+
+    async def _worker(self) -> None:
+        while True:
+            job, trace_ctx, queued_ns = await self.queue.get()
+            self.running += 1
+            try:
+                tracing.record("veo.queue_wait", trace_ctx, start_ns=queued_ns)
+                with tracing.span("generator.veo_job", parent=trace_ctx, requestId=job.requestId):
+                    ok = await run_generation(job, self)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "queueMax": self.queue.maxsize,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "pollingOperations": self.poller.pending(),
+            "stages": {name: {"count": c, "avgS": round(total / c, 3) if c else 0.0, "maxS": round(mx, 3)}
+                       for name, (c, total, mx) in self._timings.items()},
+        }
+
+VEO_DEBUG_RETAIN = os.getenv("VEO_DEBUG_RETAIN", "0") == "1"   # 합성 이미지를 LOCAL_OUTPUT_DIR에 남김
+VEO_IMAGE_MIMES  = ("image/png", "image/jpeg")                   # Veo 입력으로 그대로 넘길 수 있는 형식
+
+def _merged_image_bytes(data: bytes, mime_type: str) -> tuple[bytes, str]:
+    # Gemini inline 이미지는 대개 png/jpeg라 그대로 넘기고, 그 밖의 형식만 PNG로 다시 인코딩
+    if mime_type in VEO_IMAGE_MIMES:
+        return data, mime_type
+    buf = BytesIO()
+    Image.open(BytesIO(data)).save(buf, format="PNG")
+    return buf.getvalue(), "image/png"
+
+def _retain_merged_image(data: bytes, path: str) -> None:
     try:
-        print(f"[{now_iso()}] === 작업 시작 ===", flush=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    except OSError as e:
+        logs.warning("veo_retain_fail", str(e), path=path)
+
+VEO_STREAM_UPLOAD = os.getenv("VEO_STREAM_UPLOAD", "1") != "0"   # 0이면 예전 경로(임시파일 → 이동 → upload_file)
+VEO_KEEP_LOCAL    = os.getenv("VEO_KEEP_LOCAL", "0") == "1"      # 스트리밍 경로에서도 LOCAL_OUTPUT_DIR에 사본을 남김
 
-        # 항상 베이스 이미지는 로드
-        img_bytes, ctype1 = fetch_image_bytes_from_s3(job.img)
+def _download_video(video: Any, local_path: str) -> None:
+    client.files.download(file=video.video)
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as fp:
+        video.video.save(fp.name)
+        tmp_path = fp.name
+    shutil.move(tmp_path, local_path)
 
+async def _iter_video_chunks(video: Any):
+    # 응답에 바이트가 실려 온 경우(Vertex)는 잘라서, 아니면 다운로드 URI를 스트리밍
+    if video.video_bytes:
+        data = memoryview(video.video_bytes)
+        for i in range(0, len(data), VIEW_CHUNK_SIZE):
+            yield data[i:i + VIEW_CHUNK_SIZE]
+        return
+    if not video.uri:
+        raise RuntimeError("veo 결과에 video uri/bytes 없음")
+    async with httpx.AsyncClient(timeout=httpx.Timeout(30, read=300), follow_redirects=True) as cli:
+        async with cli.stream("GET", video.uri, headers={"x-goog-api-key": GEMINI_API_KEY}) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_bytes(VIEW_CHUNK_SIZE):
+                yield chunk
+
+async def stream_video_to_s3(video: Any, dest_bucket: str, dest_key: str,
+                             local_path: Optional[str] = None) -> int:
+    """Veo 결과 영상을 받으면서 바로 S3 멀티파트로 올린다. local_path를 주면 같은 청크로 사본도 기록.
+    디스크 왕복 없이 다운로드와 업로드가 겹친다. 올린 바이트 수 반환."""
+    f = open(local_path + ".part", "wb") if local_path else None
+    try:
+        async with S3MultipartWriter(dest_bucket, dest_key, "video/mp4") as w:
+            async for chunk in _iter_video_chunks(video):
+                if f is not None:
+                    await asyncio.gather(w.write(chunk), asyncio.to_thread(f.write, chunk))
+                else:
+                    await w.write(chunk)
+    except BaseException:
+        if f is not None:
+            f.close()
+            os.remove(local_path + ".part")
+        raise
+    if f is not None:
+        f.close()
+        os.replace(local_path + ".part", local_path)
+    return w.bytes_written
+
+async def run_generation(job: GenInVeo, executor: "VeoExecutor") -> bool:
+    event_id = f"evt_{job.requestId}_{uuid.uuid4().hex[:6]}"
+    prompt = job.veoPrompt
+    try:
         # mascotImg 존재 여부로 합성 분기
         use_fused = bool(job.mascotImg and str(job.mascotImg).strip())
-        if use_fused:
-            print(f"[{now_iso()}] 합성 모드: 베이스+마스코트 이미지", flush=True)
-            mascot_bytes, ctype2 = fetch_image_bytes_from_s3(job.mascotImg)  # 존재 가정
-            print(f"[{now_iso()}] 이미지 2개 로드 완료", flush=True)
+        logs.info("veo_start", requestId=job.requestId, fused=use_fused)
 
+        # 항상 베이스 이미지는 로드, 합성이면 마스코트(존재 가정)와 동시에 받는다
+        with executor.stage("fetch"):
+            if use_fused:
+                (img_bytes, ctype1), (mascot_bytes, ctype2) = await asyncio.gather(
+                    asyncio.to_thread(fetch_image_bytes_from_s3, job.img),
+                    asyncio.to_thread(fetch_image_bytes_from_s3, job.mascotImg),
+                )
+            else:
+                img_bytes, ctype1 = await asyncio.to_thread(fetch_image_bytes_from_s3, job.img)
+
+        if use_fused:
             img_part    = types.Part.from_bytes(data=img_bytes,    mime_type=ctype1)
             mascot_part = types.Part.from_bytes(data=mascot_bytes, mime_type=ctype2)
 
-            nb_resp = client.models.generate_content(
-                model="gemini-2.5-flash-image-preview",
-                contents=[
-                    "Create a new image by combining the mascot (second image) with the scene (first image). Seamless compositing.",
-                    img_part,
-                    mascot_part
-                ],
-            )
-            merged_img_path = os.path.join(LOCAL_OUTPUT_DIR, f"{job.requestId}_merged.png")
-            saved = False
-            if nb_resp and nb_resp.candidates:
-                for part in nb_resp.candidates[0].content.parts:
-                    if getattr(part, "inline_data", None) and part.inline_data.data:
-                        image = Image.open(BytesIO(part.inline_data.data))
-                        image.save(merged_img_path)
-                        saved = True
-                        break
-            if not saved:
-                raise RuntimeError("합성 이미지 없음")
-            print(f"[{now_iso()}] 합성 이미지 생성 완료: {merged_img_path}", flush=True)
-
-            with open(merged_img_path, "rb") as f:
-                merged_bytes = f.read()
-            merged_image_obj = types.Image(image_bytes=merged_bytes, mime_type="image/png")
+            with executor.stage("compose"):
+                nb_resp = await client.aio.models.generate_content(
+                    model="gemini-2.5-flash-image-preview",
+                    contents=[
+                        "Create a new image by combining the mascot (second image) with the scene (first image). Seamless compositing.",
+                        img_part,
+                        mascot_part
+                    ],
+                )
+                inline = None
+                if nb_resp and nb_resp.candidates:
+                    for part in nb_resp.candidates[0].content.parts:
+                        if getattr(part, "inline_data", None) and part.inline_data.data:
+                            inline = part.inline_data
+                            break
+                if inline is None:
+                    raise RuntimeError("합성 이미지 없음")
+                mime_type = (inline.mime_type or "").lower()
+                if mime_type in VEO_IMAGE_MIMES:
+                    merged_bytes, merged_mime = inline.data, mime_type
+                else:
+                    merged_bytes, merged_mime = await asyncio.to_thread(_merged_image_bytes, inline.data, mime_type)
+            logs.info("veo_composed", requestId=job.requestId, mime=merged_mime, bytes=len(merged_bytes))
+            if VEO_DEBUG_RETAIN:
+                ext = ".jpg" if merged_mime == "image/jpeg" else ".png"
+                merged_img_path = os.path.join(LOCAL_OUTPUT_DIR, f"{job.requestId}_merged{ext}")
+                # 디버그 보관은 생성 경로를 막지 않도록 백그라운드로
+                executor.spawn(asyncio.to_thread(_retain_merged_image, merged_bytes, merged_img_path))
+            merged_image_obj = types.Image(image_bytes=merged_bytes, mime_type=merged_mime)
         else:
-            print(f"[{now_iso()}] 단일 이미지 모드: 합성 생략, 베이스 이미지로 바로 진행", flush=True)
             merged_image_obj = types.Image(image_bytes=img_bytes, mime_type=ctype1)
 
-        operation = client.models.generate_videos(
-            model=VEO3_MODEL,
-            prompt=prompt,
-            image=merged_image_obj,
-            config=build_video_config(),
-        )
-        print(f"[{now_iso()}] Veo3 generate_videos 호출 성공. done={operation.done}", flush=True)
-
-        while not operation.done:
-            print(f"[{now_iso()}] 영상 생성 중... (polling)", flush=True)
-            time.sleep(VEO3_POLL_SEC)
-            operation = client.operations.get(operation)
-
-        print(f"[{now_iso()}] 영상 생성 완료", flush=True)
+        with executor.stage("submit"):
+            operation = await client.aio.models.generate_videos(
+                model=VEO3_MODEL,
+                prompt=prompt,
+                image=merged_image_obj,
+                config=build_video_config(),
+            )
+        logs.info("veo_submitted", requestId=job.requestId, operation=operation.name, done=operation.done)
 
-        video = operation.response.generated_videos[0]
-        client.files.download(file=video.video)
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as fp:
-            video.video.save(fp.name)
-            tmp_path = fp.name
+        with executor.stage("operation"):
+            operation = await executor.poller.wait(operation, VEO_MAX_OPERATION_WAIT_S)
+        if getattr(operation, "error", None):
+            raise RuntimeError(f"veo operation error: {operation.error}")
+        logs.info("veo_generated", requestId=job.requestId)
 
         local_name = f"{job.requestId}.mp4"
         local_path = os.path.join(LOCAL_OUTPUT_DIR, local_name)
-        shutil.move(tmp_path, local_path)
-        print(f"[{now_iso()}] 로컬 저장 완료: {local_path}", flush=True)
-
         out_key = f"{S3_OUTPUT_PREFIX.rstrip('/')}/{local_name}" if S3_OUTPUT_PREFIX else local_name
-        _url = upload_video_to_s3(local_path, S3_VIDEO_BUCKET, out_key)
-        print(f"[{now_iso()}] S3 업로드 완료: s3://{S3_VIDEO_BUCKET}/{out_key}", flush=True)
+        video = operation.response.generated_videos[0]
+        if VEO_STREAM_UPLOAD:
+            with executor.stage("transfer"):
+                size = await stream_video_to_s3(video.video, S3_VIDEO_BUCKET, out_key,
+                                                local_path if VEO_KEEP_LOCAL else None)
+            logs.info("veo_uploaded", requestId=job.requestId, s3=f"s3://{S3_VIDEO_BUCKET}/{out_key}", bytes=size)
+        else:
+            with executor.stage("download"):
+                await asyncio.to_thread(_download_video, video, local_path)
+            logs.info("veo_downloaded", requestId=job.requestId, path=local_path)
+            with executor.stage("upload"):
+                _url = await asyncio.to_thread(upload_video_to_s3, local_path, S3_VIDEO_BUCKET, out_key)
+            logs.info("veo_uploaded", requestId=job.requestId, s3=f"s3://{S3_VIDEO_BUCKET}/{out_key}")
 
         cb = {
             "eventId": event_id,
@@ -304,10 +1124,12 @@ def run_generation(job: GenInVeo):
                        + (" (with nanobanana fusion)" if use_fused else " (single image)"),
             "createdAt": now_iso(),
         }
-        post_callback(cb)
-        print(f"[{now_iso()}] 콜백 전송 완료", flush=True)
+        with executor.stage("callback"):
+            await post_callback(cb)
+        logs.info("veo_done", requestId=job.requestId)
+        return True
     except Exception as e:
-        print(f"[{now_iso()}] 오류 발생: {e}", flush=True)
+        logs.error("veo_fail", str(e), requestId=job.requestId)
         cb = {
             "eventId": event_id,
             "requestId": job.requestId,
@@ -320,71 +1142,89 @@ def run_generation(job: GenInVeo):
             "createdAt": now_iso(),
         }
         try:
-            post_callback(cb)
-        except:
+            await post_callback(cb)
+        except Exception:
             pass
+        return False
+
+veo_executor = VeoExecutor(VEO_CONCURRENCY, VEO_QUEUE_MAX)
 
 # =========================
 # FastAPI 통합
 # =========================
-app = FastAPI(title="Unified Generator Server")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    comfy.start()
+    veo_executor.start()
+    yield
+    await veo_executor.stop()
+    await comfy.stop()
+
+app = FastAPI(title="Unified Generator Server", lifespan=lifespan)
 app.mount("/media", StaticFiles(directory=LOCAL_OUTPUT_DIR), name="media")
 
 @app.post("/api/generate-media")
-async def generate_comfy(payload: GenInComfy = Body(...)):
-    if payload.isclient:
-        interrupted = await _interrupt_comfy()
-        if interrupted:
-            await _callback_bridge(payload, "FAILED", "interrupted by client")
-            await asyncio.sleep(2.0)
-
-    if payload.platform == "youtube":
-        wf_path = WORKFLOW_YT_PATH
-        ext = ".mp4"
-        poll_timeout = 3600
-    elif payload.platform == "reddit":
-        wf_path = WORKFLOW_REDDIT_PATH
-        ext = ".png"
-        poll_timeout = 300
-    else:
+async def generate_comfy(payload: GenInComfy = Body(...), traceparent: Optional[str] = Header(default=None)):
+    trace_ctx = tracing.parse_traceparent(traceparent)
+    template = workflows.get(payload.platform)
+    if template is None:
         await _callback_bridge(payload, "FAILED", f"unsupported platform: {payload.platform}")
         return JSONResponse({"ok": False, "error": "unsupported platform"}, status_code=400)
 
-    wf = json.loads(wf_path.read_text(encoding="utf-8"))
-    if payload.platform == "youtube":
-        if "89" in wf: wf["89"]["inputs"]["image"] = payload.img
-        if "95" in wf: wf["95"]["inputs"]["text"] = payload.englishText or ""
-        if "96" in wf: wf["96"]["inputs"]["text"] = ""
-        for _, node in wf.items():
-            if isinstance(node, dict) and node.get("class_type") == "FramePack_TextEncode_Enhanced":
-                node["inputs"]["text"] = payload.englishText or ""
-    elif payload.platform == "reddit":
-        if "16" in wf: wf["16"]["inputs"]["image"] = payload.img
-        if "6" in wf: wf["6"]["inputs"]["text"] = payload.englishText or ""
-        if "7" in wf: wf["7"]["inputs"]["text"] = ""
-
-    start_time = datetime.now()
+    ext = template.ext
+    poll_timeout = template.timeout
+    wf = template.build({
+        "image": payload.img,
+        "positive": payload.englishText or "",
+        "negative": "",
+    })
+
+    if payload.isclient:
+        await _cancel_replaced(payload)
+
     try:
-        prompt_id = await _submit_to_comfy(wf)
+        with tracing.span("generator.comfy_submit", parent=trace_ctx, requestId=payload.requestId,
+                          platform=payload.platform):
+            backend, prompt_id = await _submit_to_comfy(wf, front=bool(payload.isclient))
     except Exception as e:
-        await _callback_bridge(payload, "FAILED", f"submit failed: {e}")
+        with tracing.span("generator.comfy_job", parent=trace_ctx, requestId=payload.requestId):
+            await _callback_bridge(payload, "FAILED", f"submit failed: {e}")
         return JSONResponse({"ok": False, "error": str(e)}, status_code=502)
 
     async def _bg():
-        try:
-            result_key = await _wait_for_history_and_get_output(prompt_id, ext, poll_timeout, start_time)
-            if result_key:
-                await _callback_bridge(payload, "SUCCESS", f"{payload.platform} generation completed", result_key)
-            else:
-                await _callback_bridge(payload, "FAILED", f"no {ext} found within timeout")
-        except Exception as e:
-            await _callback_bridge(payload, "FAILED", str(e))
-    asyncio.create_task(_bg())
-    return JSONResponse({"ok": True, "promptId": prompt_id})
+        with tracing.span("generator.comfy_job", parent=trace_ctx, requestId=payload.requestId,
+                          promptId=prompt_id, backend=backend.base_url):
+            try:
+                result_key = await _wait_for_history_and_get_output(backend, prompt_id, ext, poll_timeout)
+                if result_key:
+                    await _callback_bridge(payload, "SUCCESS", f"{payload.platform} generation completed", result_key)
+                else:
+                    await _callback_bridge(payload, "FAILED", f"no {ext} found within timeout")
+            except asyncio.CancelledError:
+                # 같은 jobId의 클라이언트 요청으로 교체됨 (_cancel_replaced)
+                await _callback_bridge(payload, "FAILED", "replaced by client request")
+            except Exception as e:
+                await _callback_bridge(payload, "FAILED", str(e))
+            finally:
+                cur = _active_prompts.get(payload.jobId)
+                if cur is not None and cur[1] == prompt_id:
+                    _active_prompts.pop(payload.jobId, None)
+    _active_prompts[payload.jobId] = (backend, prompt_id, asyncio.create_task(_bg()))
+    return JSONResponse({"ok": True, "promptId": prompt_id, "backend": backend.base_url})
+
+@app.get("/comfy/stats")
+def comfy_stats():
+    return {"backends": comfy.stats()}
 
 @app.post("/api/veo3-generate")
-def veo3_generate(body: GenInVeo, bg: BackgroundTasks):
+async def veo3_generate(body: GenInVeo, traceparent: Optional[str] = Header(default=None)):
     if not body.veoPrompt or not body.requestId:
         raise HTTPException(status_code=400, detail="invalid payload")
-    bg.add_task(run_generation, body)
+    if not veo_executor.submit(body, tracing.parse_traceparent(traceparent)):
+        raise HTTPException(status_code=429, detail="veo queue full", headers={"Retry-After": "30"})
     return {"accepted": True, "requestId": body.requestId, "model": VEO3_MODEL, "type": "veo3"}
+
+@app.get("/veo/stats")
+def veo_stats():
+    return {**veo_executor.stats(), "imageCache": image_cache.stats() if image_cache else None,
+            "logging": logs.stats()}
@@ -0,0 +1,113 @@
+# logs.py
+# 구조화 로그: 요청 경로에서는 큐에 넣기만 하고(QueueHandler) 출력은 리스너 스레드가 한다.
+# 브리지/제너레이터가 같은 파일을 하나씩 들고 있다.
+#   LOG_LEVEL=INFO | DEBUG | WARNING ...
+#   LOG_FORMAT=json | text
+#   LOG_SAMPLE=kafka_ok=0.01,job_dequeued=0.1   (이벤트별 기록 비율, 없는 이벤트는 전부 기록)
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+
+LOG_LEVEL        = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT       = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE       = os.getenv("LOG_SAMPLE", "kafka_ok=0.01,job_dequeued=0.1")
+LOG_QUEUE_MAX    = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_SERVICE_NAME = os.getenv("LOG_SERVICE_NAME", "generator")
+
+_sample: Dict[str, float] = {
+    k.strip(): float(v) for k, v in (kv.split("=", 1) for kv in LOG_SAMPLE.split(",") if "=" in kv)
+}
+_counts = {"dropped": 0, "sampledOut": 0}
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "service": LOG_SERVICE_NAME,
+            "event": getattr(record, "event", record.name),
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        ts = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+        return f"[{ts}] {record.levelname} [{getattr(record, 'event', record.name)}] {record.getMessage()} {fields}".rstrip()
+
+
+class _DropQueueHandler(QueueHandler):
+    """큐가 가득 차면 기다리지 않고 버린다(버린 수는 stats()로).
+    같은 프로세스 안의 리스너가 받으므로 prepare에서 미리 포맷하지 않는다 (포맷은 리스너 스레드에서)."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _counts["dropped"] += 1
+
+
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_MAX)
+
+
+def _setup() -> logging.Logger:
+    logger = logging.getLogger(LOG_SERVICE_NAME)
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(_JsonFormatter() if LOG_FORMAT == "json" else _TextFormatter())
+    listener = QueueListener(_queue, out, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)   # 종료 시 남은 로그 flush
+    logger.addHandler(_DropQueueHandler(_queue))
+    return logger
+
+
+_logger = _setup()
+
+
+def event(name: str, msg: str = "", level: int = logging.INFO, **fields: Any) -> None:
+    """log.event("kafka_ok", topic=..., offset=...) — 레벨/샘플링에서 걸러지면 포맷도 하지 않는다."""
+    if not _logger.isEnabledFor(level):
+        return
+    rate = _sample.get(name)
+    if rate is not None and rate < 1.0 and random.random() >= rate:
+        _counts["sampledOut"] += 1
+        return
+    if rate is not None and rate < 1.0:
+        fields["sampleRate"] = rate
+    _logger.log(level, msg, extra={"event": name, "fields": fields})
+
+
+def debug(name: str, msg: str = "", **fields: Any) -> None:
+    event(name, msg, logging.DEBUG, **fields)
+
+
+def info(name: str, msg: str = "", **fields: Any) -> None:
+    event(name, msg, logging.INFO, **fields)
+
+
+def warning(name: str, msg: str = "", **fields: Any) -> None:
+    event(name, msg, logging.WARNING, **fields)
+
+
+def error(name: str, msg: str = "", **fields: Any) -> None:
+    event(name, msg, logging.ERROR, **fields)
+
+
+def stats() -> Dict[str, Any]:
+    return {**_counts, "queued": _queue.qsize(), "level": logging.getLevelName(_logger.level)}
@@ -0,0 +1,193 @@
+# tracing.py
+# W3C traceparent 전파 + 구간(span) 시간 기록. 브리지/제너레이터가 같은 파일을 하나씩 들고 있다.
+#   TRACE_EXPORT=off | jsonl | otlp
+#   TRACE_FILE=./traces.jsonl            (jsonl)
+#   TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces   (otlp, OTLP/HTTP JSON)
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import logs
+
+TRACE_EXPORT        = os.getenv("TRACE_EXPORT", "off").lower()
+TRACE_FILE          = os.getenv("TRACE_FILE", "./traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+TRACE_SERVICE_NAME  = os.getenv("TRACE_SERVICE_NAME", "generator")
+TRACE_BATCH_SIZE    = 256
+TRACE_FLUSH_S       = 1.0
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id, self.span_id = trace_id, span_id
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class Span:
+    __slots__ = ("context", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional[SpanContext], start_ns: Optional[int] = None,
+                 context: Optional[SpanContext] = None, attributes: Optional[Dict[str, Any]] = None):
+        # context: new_context()로 미리 만들어 둔 자기 자신의 컨텍스트 (없으면 새로 발급)
+        self.context = context or SpanContext(parent.trace_id if parent else secrets.token_hex(16),
+                                              secrets.token_hex(8))
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = end_ns or time.time_ns()
+        _exporter.submit(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service": TRACE_SERVICE_NAME, "traceId": self.context.trace_id, "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id, "name": self.name, "startNs": self.start_ns, "endNs": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3), "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("trace_current", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    # 00-<32hex trace-id>-<16hex parent-id>-<2hex flags>
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower())
+
+
+def new_context(parent: Optional[SpanContext] = None) -> SpanContext:
+    """아직 기록하지 않은 (잡 전체) span의 컨텍스트. 잡이 끝날 때 record(..., context=ctx)로 닫는다."""
+    return SpanContext(parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8))
+
+
+def current() -> Optional[SpanContext]:
+    return _current.get()
+
+
+def inject(headers: Optional[Dict[str, str]] = None, ctx: Optional[SpanContext] = None) -> Dict[str, str]:
+    headers = dict(headers or {})
+    ctx = ctx or _current.get()
+    if ctx is not None:
+        headers["traceparent"] = ctx.traceparent
+    return headers
+
+
+@contextmanager
+def span(name: str, parent: Optional[SpanContext] = None, **attributes: Any):
+    """with span("bridge.llm", parent=ctx): ... — parent를 안 주면 현재 span 아래에 붙는다.
+    블록 안의 httpx 호출은 inject()로 이 span을 부모로 전파."""
+    s = Span(name, parent or _current.get(), attributes=attributes)
+    token = _current.set(s.context)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def record(name: str, parent: Optional[SpanContext], start_ns: int, end_ns: Optional[int] = None,
+           context: Optional[SpanContext] = None, **attributes: Any) -> Span:
+    # 이미 지난 구간(큐 대기, 잡 전체 등)을 시작 시각을 지정해 한 번에 기록
+    s = Span(name, parent, start_ns=start_ns, context=context, attributes=attributes)
+    s.end(end_ns)
+    return s
+
+
+class _Exporter:
+    """끝난 span을 큐에 넣고 백그라운드 스레드가 묶어서 내보낸다. 요청 경로에서는 put 한 번뿐."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.dropped = 0
+        self._q: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        if mode in ("jsonl", "otlp"):
+            threading.Thread(target=self._run, daemon=True, name="trace-exporter").start()
+
+    def submit(self, s: Span) -> None:
+        if self.mode not in ("jsonl", "otlp"):
+            return
+        try:
+            self._q.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._q.get()]
+            deadline = time.monotonic() + TRACE_FLUSH_S
+            while len(batch) < TRACE_BATCH_SIZE:
+                try:
+                    batch.append(self._q.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self._write_jsonl(batch) if self.mode == "jsonl" else self._post_otlp(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logs.warning("trace_export_fail", str(e), spans=len(batch), mode=self.mode)
+
+    def _write_jsonl(self, batch: list[Span]) -> None:
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for s in batch:
+                f.write(json.dumps(s.to_dict(), ensure_ascii=False) + "\n")
+
+    def _post_otlp(self, batch: list[Span]) -> None:
+        import httpx
+
+        def attr(k: str, v: Any) -> Dict[str, Any]:
+            if isinstance(v, bool):
+                return {"key": k, "value": {"boolValue": v}}
+            if isinstance(v, int):
+                return {"key": k, "value": {"intValue": str(v)}}
+            if isinstance(v, float):
+                return {"key": k, "value": {"doubleValue": v}}
+            return {"key": k, "value": {"stringValue": str(v)}}
+
+        spans = [{
+            "traceId": s.context.trace_id, "spanId": s.context.span_id,
+            **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+            "name": s.name, "kind": 1,
+            "startTimeUnixNano": str(s.start_ns), "endTimeUnixNano": str(s.end_ns),
+            "attributes": [attr(k, v) for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        } for s in batch]
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", TRACE_SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": TRACE_SERVICE_NAME}, "spans": spans}],
+        }]}
+        httpx.post(TRACE_OTLP_ENDPOINT, json=body, timeout=5).raise_for_status()
+
+
+_exporter = _Exporter(TRACE_EXPORT)
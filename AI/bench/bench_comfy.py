@@ -0,0 +1,72 @@
+# bench_comfy.py
+# ComfyUI 완료 감지 비교: 공유 WebSocket vs 공유 /history 폴링
+# fake_comfy 로 prompt N개를 제출하고 완료 지연과 ComfyUI로 간 /history 요청 수/초를 잰다.
+# 대기 prompt 수(N)를 늘려도 history_rps가 일정해야 한다.
+#   python AI/bench/bench_comfy.py --prompts 10,50,200 --exec-ms 50
+import os, sys, tempfile
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "AI", "prompt"))
+for k, v in {"GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img", "S3_VIDEO_BUCKET": "bench-video",
+             "S3_REGION": "us-east-1", "LOCAL_OUTPUT_DIR": tempfile.mkdtemp()}.items():
+    os.environ.setdefault(k, v)
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import fake_comfy
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+async def run(gs, base_url: str, use_ws: bool, n: int) -> dict:
+    gs.COMFY_WS_ENABLED = use_ws
+    backend = gs.ComfyBackend(base_url)
+    backend.start()
+    if use_ws:
+        while not backend.ws_connected:
+            await asyncio.sleep(0.05)
+    async with httpx.AsyncClient() as cli:
+        before = (await cli.get(f"{base_url}/_stats")).json()["requests"]
+
+        async def one(i: int) -> float:
+            t0 = time.perf_counter()
+            pid = await backend.submit({"1": {"class_type": "SaveImage", "inputs": {}}})
+            await backend.wait(pid, timeout=600)
+            return time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        lat = await asyncio.gather(*(one(i) for i in range(n)))
+        wall = time.perf_counter() - t0
+        after = (await cli.get(f"{base_url}/_stats")).json()["requests"]
+    await backend.stop()
+    polls = sum(v - before.get(k, 0) for k, v in after.items() if k.startswith("GET history"))
+    return {"mode": "ws" if use_ws else "poll", "prompts": n, "wall_s": round(wall, 2),
+            "history_requests": polls, "history_rps": round(polls / wall, 2),
+            "p50_s": round(_pct(lat, 50), 3), "p99_s": round(_pct(lat, 99), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prompts", default="10,50,200")
+    ap.add_argument("--exec-ms", type=float, default=200.0)
+    ap.add_argument("--poll-interval", type=float, default=2.0)
+    a = ap.parse_args()
+
+    os.environ["POLL_INTERVAL"] = str(a.poll_interval)
+    import generator_server as gs
+
+    base_url, server = fake_comfy.start(exec_ms=a.exec_ms)
+    for n in (int(x) for x in a.prompts.split(",")):
+        for use_ws in (False, True):
+            print(asyncio.run(run(gs, base_url, use_ws, n)))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench_comfy_lb.py
+# ComfyUI 다중 백엔드 분배: fake_comfy K대에 prompt N개를 몰아넣고 처리량을 잰다.
+# fake_comfy는 한 대당 한 번에 하나씩 실행하므로 처리량이 K에 비례해야 한다.
+#   python AI/bench/bench_comfy_lb.py --backends 1,2,4 --prompts 40 --exec-ms 200
+import os, sys, tempfile
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "AI", "prompt"))
+for k, v in {"GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img", "S3_VIDEO_BUCKET": "bench-video",
+             "S3_REGION": "us-east-1", "LOCAL_OUTPUT_DIR": tempfile.mkdtemp()}.items():
+    os.environ.setdefault(k, v)
+
+import argparse
+import asyncio
+import collections
+import time
+
+import fake_comfy
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+async def run(gs, base_urls: list[str], n: int) -> dict:
+    pool = gs.ComfyPool(base_urls)
+    pool.start()
+    while not all(b.ws_connected for b in pool.backends):
+        await asyncio.sleep(0.05)
+    placed = collections.Counter()
+
+    async def one(i: int) -> float:
+        t0 = time.perf_counter()
+        backend, pid = await pool.submit({"1": {"class_type": "SaveImage", "inputs": {}}})
+        placed[backend.base_url] += 1
+        await backend.wait(pid, timeout=600)
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lat = await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t0
+    await pool.stop()
+    return {"backends": len(base_urls), "prompts": n, "wall_s": round(wall, 2),
+            "prompts_per_s": round(n / wall, 2), "p50_s": round(_pct(lat, 50), 3),
+            "p99_s": round(_pct(lat, 99), 3), "per_backend": sorted(placed.values())}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="1,2,4")
+    ap.add_argument("--prompts", type=int, default=40)
+    ap.add_argument("--exec-ms", type=float, default=200.0)
+    ap.add_argument("--min-scale", type=float, default=0.7, help="기대 처리량 배수(백엔드 수 비) 대비 최소 비율")
+    a = ap.parse_args()
+
+    import generator_server as gs
+
+    counts = [int(x) for x in a.backends.split(",")]
+    servers = [fake_comfy.start(exec_ms=a.exec_ms) for _ in range(max(counts))]
+    results = []
+    for k in counts:
+        res = asyncio.run(run(gs, [url for url, _ in servers[:k]], a.prompts))
+        results.append(res)
+        print(res)
+    for _, server in servers:
+        server.should_exit = True
+
+    # 동시에 몰린 prompt가 백엔드마다 고르게 퍼지고, 처리량이 백엔드 수에 비례해 늘어야 한다
+    failed = []
+    base = results[0]
+    for res in results:
+        k, per = res["backends"], res["per_backend"]
+        if len(per) != k or max(per) - min(per) > max(1, a.prompts // (4 * k)):
+            failed.append(f"uneven spread on {k} backends: {per}")
+        scale = res["prompts_per_s"] / base["prompts_per_s"]
+        expected = k / base["backends"]
+        if scale < a.min_scale * expected:
+            failed.append(f"{k} backends: {scale:.2f}x throughput, expected ~{expected:.1f}x")
+    for msg in failed:
+        print("FAIL:", msg)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_comments_batch.py
+# /api/comments 분석 경로 비교: 봉투마다 단건 호출 vs MicroBatcher 마이크로배치
+#   python AI/bench/bench_comments_batch.py --requests 400 --concurrency 64 --latency-ms 800 --window-ms 25 --max-batch 8
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import stubs
+
+
+def _envelope(i: int) -> dict:
+    return {
+        "youtube": {"videoId": f"vid{i}", "comments": [
+            {"comment_id": f"c{i}_{k}", "author": None, "comment": f"comment {k} on video {i} " * 4,
+             "like_count": 100 - k, "total_reply_count": k, "published_at": None}
+            for k in range(20)
+        ]},
+        "reddit": None,
+        "topic": "bench",
+    }
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+async def run(llm, srv, mode: str, n: int, concurrency: int, window_ms: float, max_batch: int) -> dict:
+    from bridge.batcher import MicroBatcher
+
+    batcher = MicroBatcher(llm.summarize_top3_batch_async, llm.summarize_top3_text_async,
+                           window_s=window_ms / 1000.0, max_items=max_batch)
+    call = batcher.submit if mode == "batch" else llm.summarize_top3_text_async
+    sem = asyncio.Semaphore(concurrency)
+    before = {m: dict(u) for m, u in llm.comment_usage.items()}
+    calls0 = srv.calls
+
+    async def one(i: int) -> float:
+        async with sem:
+            t0 = time.perf_counter()
+            res = await call(_envelope(i))
+            assert res and res["video_id"] == f"vid{i}", res
+            return (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    lat = await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t0
+    await batcher.close()
+
+    tokens = sum(u["promptTokens"] + u["outputTokens"] - before[m]["promptTokens"] - before[m]["outputTokens"]
+                 for m, u in llm.comment_usage.items())
+    out = {
+        "mode": mode, "requests": n, "rps": round(n / wall, 1),
+        "p50_ms": round(_pct(lat, 50), 1), "p99_ms": round(_pct(lat, 99), 1),
+        "mean_ms": round(statistics.fmean(lat), 1),
+        "gemini_calls": srv.calls - calls0, "tokens_per_envelope": round(tokens / n, 1),
+    }
+    if mode == "batch":
+        st = batcher.stats()
+        out.update(calls_saved=st["callsSaved"], avg_batch=st["avgBatchSize"], fallbacks=st["fallbacks"])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--latency-ms", type=float, default=800.0)
+    ap.add_argument("--window-ms", type=float, default=25.0)
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--bad-batch-rate", type=float, default=0.0, help="배치 응답에서 문서 하나를 빼먹는 비율")
+    a = ap.parse_args()
+
+    srv = stubs.start_gemini(latency_ms=a.latency_ms, bad_batch_rate=a.bad_batch_rate)
+    os.environ["GEMINI_BASE_URL"] = stubs.url(srv)
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ["LLM_HTTP_POOL_SIZE"] = str(a.concurrency)
+    from bridge import llm_client as llm
+
+    async def both():
+        llm.open_http_pool()
+        for mode in ("single", "batch"):
+            print(await run(llm, srv, mode, a.requests, a.concurrency, a.window_ms, a.max_batch))
+        await llm.close_http_pool()
+
+    asyncio.run(both())
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
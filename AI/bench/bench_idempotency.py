@@ -0,0 +1,56 @@
+# bench_idempotency.py
+# 멱등 저장소 합성 리플레이: 요청 수가 늘어도 RSS가 평평한지 확인
+#   python AI/bench/bench_idempotency.py --requests 10000000 --dup-rate 0.1
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import tempfile
+import time
+import uuid
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=10_000_000)
+    ap.add_argument("--dup-rate", type=float, default=0.1)
+    ap.add_argument("--max-entries", type=int, default=100_000)
+    ap.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    ap.add_argument("--report-every", type=int, default=1_000_000)
+    a = ap.parse_args()
+
+    from bridge.idempotency import MemoryIdempotencyStore, SQLiteIdempotencyStore
+    if a.backend == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(), "idemp.sqlite3")
+        store = SQLiteIdempotencyStore(path, a.max_entries, ttl_s=3600)
+    else:
+        store = MemoryIdempotencyStore(a.max_entries, ttl_s=3600)
+
+    recent: list[str] = []
+    t0 = time.perf_counter()
+    for i in range(1, a.requests + 1):
+        if recent and random.random() < a.dup_rate:
+            key = random.choice(recent)
+        else:
+            key = uuid.uuid4().hex
+            if len(recent) < 1000:
+                recent.append(key)
+            else:
+                recent[i % 1000] = key
+        store.get_or_create(key, lambda: "req_" + uuid.uuid4().hex)
+        if i % a.report_every == 0:
+            print({"requests": i, "rss_mb": round(_rss_mb(), 1),
+                   "rps": round(i / (time.perf_counter() - t0)), **store.stats()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_kafka.py
+# produce_kafka 처리량 비교: 메시지마다 flush(기존) vs 백그라운드 poller + linger 배치
+# confluent_kafka 대신 stubs.MockProducer(브로커 RTT 흉내)를 끼워 넣어 컨테이너 없이 돈다.
+#   python AI/bench/bench_kafka.py --messages 5000 --threads 8 --rtt-ms 5
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stubs
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def run(app, mode: str, n: int, threads: int) -> dict:
+    def legacy(key: str, value: dict):
+        app.producer.produce(topic=app.KAFKA_TOPIC, key=key,
+                             value=json.dumps(value).encode("utf-8"))
+        app.producer.flush(5)
+
+    send = legacy if mode == "flush-per-message" else app.produce_kafka
+    poller = None
+    if mode == "batched":
+        app.kafka_stop.clear()
+        poller = threading.Thread(target=app.kafka_poller, daemon=True)
+        poller.start()
+
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        send(f"evt_{i}", {"eventId": f"evt_{i}", "status": "SUCCESS"})
+        return (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        lat = list(ex.map(one, range(n)))
+    app.producer.flush(30)
+    wall = time.perf_counter() - t0
+    if poller:
+        app.kafka_stop.set()
+        poller.join()
+    return {"mode": mode, "messages": n, "msgs_per_s": round(n / wall, 1),
+            "call_p50_ms": round(_pct(lat, 50), 3), "call_p99_ms": round(_pct(lat, 99), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=5000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--rtt-ms", type=float, default=5.0)
+    a = ap.parse_args()
+
+    stubs.MOCK_KAFKA_RTT_MS = a.rtt_ms
+    stubs.install_kafka_mock()
+    os.environ.setdefault("TTL_SECONDS", "600")
+    os.environ.setdefault("WORKER_CONCURRENCY", "4")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        from bridge import app
+        results = [run(app, mode, a.messages, a.threads) for mode in ("flush-per-message", "batched")]
+    for r in results:
+        print(r)
+
+
+if __name__ == "__main__":
+    main()
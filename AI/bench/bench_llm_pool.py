@@ -0,0 +1,66 @@
+# bench_llm_pool.py
+# summarize_to_english 지연시간(p50/p99) 비교: 공유 HTTP 풀 on/off
+#   python AI/bench/bench_llm_pool.py --requests 500 --concurrency 16 --latency-ms 20
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stubs
+
+PAYLOAD = {
+    "weather": {"areaName": "Seoul", "temperature": "27", "humidity": "60", "uvIndex": "5"},
+    "user": None,
+}
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def run(llm, pooled: bool, n: int, concurrency: int) -> dict:
+    llm.HTTP_POOL_ENABLED = pooled
+
+    def one(_):
+        t0 = time.perf_counter()
+        llm.summarize_to_english(PAYLOAD)
+        return (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        lat = list(ex.map(one, range(n)))
+    wall = time.perf_counter() - t0
+    return {
+        "pool": pooled,
+        "requests": n,
+        "rps": round(n / wall, 1),
+        "p50_ms": round(_pct(lat, 50), 2),
+        "p99_ms": round(_pct(lat, 99), 2),
+        "mean_ms": round(statistics.fmean(lat), 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    a = ap.parse_args()
+
+    srv = stubs.start_gemini(latency_ms=a.latency_ms)
+    os.environ["GEMINI_BASE_URL"] = stubs.url(srv)
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ["LLM_CACHE_BACKEND"] = "off"   # 동일 페이로드라 캐시가 켜져 있으면 측정이 무의미
+    from bridge import llm_client as llm
+
+    for pooled in (False, True):
+        print(run(llm, pooled, a.requests, a.concurrency))
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_scheduler.py
+# 잡 처리 모델 비교: 스레드 워커(PriorityQueue) vs asyncio JobScheduler
+# 각 모델은 별도 프로세스에서 돌려 RSS/스레드 수를 따로 잰다.
+#   python AI/bench/bench_scheduler.py --jobs 1000 --concurrency 200 --llm-ms 200 --gen-ms 50
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import threading
+import time
+from queue import PriorityQueue
+
+import stubs
+
+PAYLOAD = {
+    "weather": {"areaName": "Seoul", "temperature": "27", "humidity": "60", "uvIndex": "5"},
+    "user": None,
+}
+
+
+def _rss_mb() -> float:
+    # 리눅스 ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_thread_model(n: int, concurrency: int, gen_url: str) -> dict:
+    import httpx
+    from bridge import llm_client as llm
+
+    q: "PriorityQueue[tuple[int, int, dict]]" = PriorityQueue()
+    done = threading.Semaphore(0)
+    peak_threads = 0
+
+    def worker():
+        with httpx.Client() as cli:
+            while True:
+                _, _, job = q.get()
+                text = llm.summarize_to_english(job)
+                cli.post(gen_url, json={"requestId": job["requestId"], "englishText": text})
+                done.release()
+
+    t0 = time.perf_counter()
+    for _ in range(concurrency):
+        threading.Thread(target=worker, daemon=True).start()
+    for i in range(n):
+        q.put((1, i, {**PAYLOAD, "requestId": f"req_{i}"}))
+    for _ in range(n):
+        done.acquire()
+        peak_threads = max(peak_threads, threading.active_count())
+    wall = time.perf_counter() - t0
+    return {"model": "thread", "jobs": n, "jps": round(n / wall, 1),
+            "rss_mb": round(_rss_mb(), 1), "threads": peak_threads}
+
+
+def run_async_model(n: int, concurrency: int, gen_url: str) -> dict:
+    from bridge import llm_client as llm
+    from bridge.scheduler import JobScheduler
+
+    async def main() -> dict:
+        finished = asyncio.Event()
+        count = 0
+        peak_threads = 0
+        cli = llm.AsyncClientShards(concurrency)   # app.py의 gen_clients와 같은 구성
+
+        async def handler(prio, job):
+            nonlocal count, peak_threads
+            async with sched.stage("llm"):
+                text = await llm.summarize_to_english_async(job)
+            async with sched.stage("generator"):
+                await cli.next().post(gen_url, json={"requestId": job["requestId"], "englishText": text})
+            count += 1
+            peak_threads = max(peak_threads, threading.active_count())
+            if count == n:
+                finished.set()
+
+        sched = JobScheduler(handler, max_inflight=concurrency,
+                             stage_limits={"llm": concurrency, "generator": concurrency})
+        sched.start()
+        t0 = time.perf_counter()
+        for i in range(n):
+            sched.submit(1, {**PAYLOAD, "requestId": f"req_{i}"})
+        await finished.wait()
+        wall = time.perf_counter() - t0
+        await sched.stop()
+        await cli.aclose()
+        await llm.close_http_pool()
+        return {"model": "async", "jobs": n, "jps": round(n / wall, 1),
+                "rss_mb": round(_rss_mb(), 1), "threads": peak_threads}
+
+    return asyncio.run(main())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--llm-ms", type=float, default=200.0)
+    ap.add_argument("--gen-ms", type=float, default=50.0)
+    ap.add_argument("--model", choices=["thread", "async"])
+    ap.add_argument("--gen-url")
+    ap.add_argument("--timeout-s", type=float, default=180.0, help="모델 하나(자식 프로세스)당 제한 시간")
+    a = ap.parse_args()
+
+    if a.model:
+        # 자식 프로세스: 한 모델만 돌리고 결과를 JSON 한 줄로 출력
+        fn = run_thread_model if a.model == "thread" else run_async_model
+        print(json.dumps(fn(a.jobs, a.concurrency, a.gen_url)))
+        return
+
+    gemini = stubs.start_gemini(latency_ms=a.llm_ms)
+    gen = stubs.start_generator(latency_ms=a.gen_ms)
+    env = {**os.environ, "GEMINI_BASE_URL": stubs.url(gemini), "LLM_CACHE_BACKEND": "off",
+           "LLM_HTTP_POOL_SIZE": str(a.concurrency)}
+    env.setdefault("GOOGLE_API_KEY", "bench")
+    for model in ("thread", "async"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--model", model, "--jobs", str(a.jobs),
+             "--concurrency", str(a.concurrency), "--gen-url", stubs.url(gen) + "/api/generate-media"],
+            env=env, capture_output=True, text=True, check=True, timeout=a.timeout_s,
+        )
+        print(out.stdout.strip().splitlines()[-1])
+    gemini.shutdown()
+    gen.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_state.py
+# JobStateStore 경합: 워커 스레드 수를 늘리면서 콜백 경로(pop) 지연시간 측정
+# shards=1 은 예전 전역 락 하나와 같은 구조
+#   python AI/bench/bench_state.py --workers 1,4,16,64 --shards 1,16
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bridge.state import JobStateStore
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def run(shards: int, workers: int, callbacks: int) -> dict:
+    st = JobStateStore(shards=shards)
+    stop = threading.Event()
+    registered = [0]
+    deadline = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    def worker(w: int):
+        i = 0
+        while not stop.is_set():
+            rid = f"w{w}_{i}"
+            st.register(rid, {"jobId": i, "deadline": deadline})
+            st.update(rid, englishText="x")
+            st.pop(rid)
+            i += 1
+        registered[0] += i
+
+    threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(workers)]
+    for t in threads:
+        t.start()
+    lat = []
+    for i in range(callbacks):
+        rid = f"cb_{i}"
+        st.register(rid, {"jobId": i, "deadline": deadline})
+        t0 = time.perf_counter()
+        st.pop(rid)
+        lat.append((time.perf_counter() - t0) * 1e6)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {"shards": shards, "workers": workers,
+            "callback_p50_us": round(_pct(lat, 50), 1), "callback_p99_us": round(_pct(lat, 99), 1),
+            "registered": registered[0] + callbacks, "heap_left": st.heap_size()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,4,16,64")
+    ap.add_argument("--shards", default="1,16")
+    ap.add_argument("--callbacks", type=int, default=20000)
+    a = ap.parse_args()
+    for shards in (int(x) for x in a.shards.split(",")):
+        for workers in (int(x) for x in a.workers.split(",")):
+            print(run(shards, workers, a.callbacks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_veo_upload.py
+# Veo 완료 후 구간(다운로드 → S3 업로드) 지연 비교
+#   legacy: 전체를 메모리로 받음 → 임시파일 → LOCAL_OUTPUT_DIR로 이동 → upload_file
+#   stream: 받는 즉시 S3MultipartWriter로 멀티파트 업로드 (local 사본 옵션)
+# S3는 moto 서버(ThreadedMotoServer), 영상 URI는 stubs.start_blob 으로 대신한다.
+#   python AI/bench/bench_veo_upload.py --sizes-mb 50,100,200 --mbps 25
+# --mbps(MiB/s)는 실제 Veo 다운로드 대역폭에 가깝게 둔다. 25 MiB/s, 파트 16MB x 동시 4 기준:
+#   50MB  legacy 2.73s / stream 2.38s / stream+local 2.39s
+#   100MB legacy 5.19s / stream 4.55s / stream+local 4.64s  → 스트리밍은 다운로드 시간 + 마지막 파트 업로드 정도
+# --mbps 0(루프백 무제한)에서는 다운로드가 moto 업로드보다 빨라 겹칠 구간이 없고 파트 버퍼 복사만 남아서
+# legacy가 조금 빠르다(50MB: 0.86s vs 1.01s). 즉 다운로드가 업로드보다 느린 실제 환경에서만 이득이 난다.
+# 파트 8MB/16MB, 동시 4/8 사이에서는 차이가 측정 오차 수준이라 기본값(16MB x 4)을 유지.
+import os, sys, tempfile
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "AI", "prompt"))
+
+import argparse
+import asyncio
+import logging
+import shutil
+import time
+from types import SimpleNamespace
+
+import httpx
+
+import stubs
+
+
+def _start_moto() -> str:
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)   # moto 요청마다 찍히는 access log 끔
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+
+def _legacy(gs, uri: str, key: str) -> None:
+    # client.files.download 와 같이 본문 전체를 메모리로 받은 뒤 예전 경로 그대로
+    data = httpx.get(uri, timeout=600).content
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as fp:
+        fp.write(data)
+        tmp_path = fp.name
+    local_path = os.path.join(gs.LOCAL_OUTPUT_DIR, os.path.basename(key))
+    shutil.move(tmp_path, local_path)
+    gs.upload_video_to_s3(local_path, gs.S3_VIDEO_BUCKET, key)
+
+
+async def _stream(gs, uri: str, key: str, keep_local: bool) -> None:
+    video = SimpleNamespace(video_bytes=None, uri=uri)
+    local_path = os.path.join(gs.LOCAL_OUTPUT_DIR, os.path.basename(key)) if keep_local else None
+    await gs.stream_video_to_s3(video, gs.S3_VIDEO_BUCKET, key, local_path)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes-mb", default="50,100,200")
+    ap.add_argument("--mbps", type=float, default=25.0, help="다운로드 대역폭 제한 MiB/s (0=무제한)")
+    ap.add_argument("--part-size-mb", type=int, default=16)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    a = ap.parse_args()
+
+    os.environ.update({
+        "AWS_ENDPOINT_URL": _start_moto(), "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+        "GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img", "S3_VIDEO_BUCKET": "bench-video",
+        "S3_REGION": "us-east-1", "LOCAL_OUTPUT_DIR": tempfile.mkdtemp(),
+        "S3_PART_SIZE_MB": str(a.part_size_mb), "S3_UPLOAD_CONCURRENCY": str(a.concurrency),
+    })
+    import generator_server as gs
+    gs.s3_client.create_bucket(Bucket=gs.S3_VIDEO_BUCKET)
+
+    for size_mb in (int(x) for x in a.sizes_mb.split(",")):
+        blob = stubs.start_blob(size_bytes=size_mb * 1024 * 1024, mbps=a.mbps)
+        uri = stubs.url(blob) + "/video.mp4"
+        modes = {
+            "legacy": lambda key: _legacy(gs, uri, key),
+            "stream": lambda key: asyncio.run(_stream(gs, uri, key, False)),
+            "stream+local": lambda key: asyncio.run(_stream(gs, uri, key, True)),
+        }
+        for mode, fn in modes.items():
+            times = []
+            for i in range(a.repeat):
+                key = f"bench/{mode}_{size_mb}_{i}.mp4"
+                t0 = time.perf_counter()
+                fn(key)
+                times.append(time.perf_counter() - t0)
+            best = min(times)
+            print({"size_mb": size_mb, "mode": mode, "best_s": round(best, 2),
+                   "avg_s": round(sum(times) / len(times), 2), "mb_per_s": round(size_mb / best, 1)})
+        blob.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# fake_comfy.py
+# 벤치마크용 ComfyUI 대역: /prompt, /history, /queue, /interrupt, /view, /ws (+ /_stats, /_drop_ws)
+# 큐에 들어온 prompt를 exec_ms 동안 하나씩 "실행"하고, 제출한 clientId 소켓으로 이벤트를 보낸다.
+#   python fake_comfy.py --port 8188 --exec-ms 500
+import argparse
+import asyncio
+import collections
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+
+
+def make_app(exec_ms: float = 500.0, output_bytes: int = 64 * 1024, fail_rate: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = collections.Counter()          # 엔드포인트별 HTTP 요청 수
+    pending: "collections.deque[tuple[str, str, Dict[str, Any]]]" = collections.deque()
+    history: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
+    sockets: Dict[str, WebSocket] = {}
+    running: Dict[str, Optional[str]] = {"prompt_id": None}
+    interrupted: set[str] = set()
+    wake = asyncio.Event()
+
+    async def _send(client_id: str, etype: str, data: Dict[str, Any]):
+        ws = sockets.get(client_id)
+        if ws is not None:
+            try:
+                await ws.send_json({"type": etype, "data": data})
+            except Exception:
+                sockets.pop(client_id, None)
+
+    async def _status():
+        for cid in list(sockets):
+            await _send(cid, "status", {"status": {"exec_info": {"queue_remaining": len(pending) + (1 if running["prompt_id"] else 0)}}})
+
+    async def _executor():
+        import random
+        while True:
+            while not pending:
+                wake.clear()
+                await wake.wait()
+            prompt_id, client_id, workflow = pending.popleft()
+            running["prompt_id"] = prompt_id
+            await _status()
+            await _send(client_id, "execution_start", {"prompt_id": prompt_id})
+            await _send(client_id, "executing", {"node": "1", "prompt_id": prompt_id})
+            t_end = time.monotonic() + exec_ms / 1000.0
+            while time.monotonic() < t_end and prompt_id not in interrupted:
+                await asyncio.sleep(min(0.05, max(t_end - time.monotonic(), 0)))
+            ext = ".mp4" if any(isinstance(n, dict) and n.get("class_type", "").startswith("FramePack") for n in workflow.values()) else ".png"
+            if prompt_id in interrupted:
+                # 실제 ComfyUI와 같이: interrupt는 execution_interrupted, history는 status_str "error"
+                msg = ["execution_interrupted", {"prompt_id": prompt_id, "node_id": "1"}]
+                history[prompt_id] = {"status": {"status_str": "error", "completed": False, "messages": [msg]}, "outputs": {}}
+                await _send(client_id, "execution_interrupted", msg[1])
+            elif fail_rate and random.random() < fail_rate:
+                msg = ["execution_error", {"prompt_id": prompt_id, "node_id": "1", "exception_message": "fake failure"}]
+                history[prompt_id] = {"status": {"status_str": "error", "completed": False, "messages": [msg]}, "outputs": {}}
+                await _send(client_id, "execution_error", msg[1])
+            else:
+                out = {"images": [{"filename": f"{prompt_id}{ext}", "subfolder": "", "type": "output"}]}
+                history[prompt_id] = {"status": {"status_str": "success", "completed": True}, "outputs": {"9": out}}
+                await _send(client_id, "executed", {"node": "9", "output": out, "prompt_id": prompt_id})
+                await _send(client_id, "execution_success", {"prompt_id": prompt_id})
+            await _send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+            running["prompt_id"] = None
+            interrupted.discard(prompt_id)
+            await _status()
+
+    @app.on_event("startup")
+    async def _start():
+        asyncio.create_task(_executor())
+
+    @app.middleware("http")
+    async def _count(request: Request, call_next):
+        parts = request.url.path.split("/")
+        # /history/{id} 단건 조회는 bulk /history 와 따로 셈 (둘 다 "GET history"로 시작)
+        name = parts[1] + ("_one" if parts[1] == "history" and len(parts) > 2 else "")
+        app.state.requests[f"{request.method} {name}"] += 1
+        return await call_next(request)
+
+    @app.post("/prompt")
+    async def prompt(body: Dict[str, Any]):
+        prompt_id = uuid.uuid4().hex
+        item = (prompt_id, body.get("client_id") or "", body.get("prompt") or {})
+        if body.get("front"):
+            pending.appendleft(item)
+        else:
+            pending.append(item)
+        wake.set()
+        await _status()
+        return {"prompt_id": prompt_id, "number": len(pending)}
+
+    @app.get("/history")
+    async def history_all(max_items: Optional[int] = None):
+        items = list(history.items())
+        if max_items:
+            items = items[-max_items:]
+        return dict(items)
+
+    @app.get("/history/{prompt_id}")
+    async def history_one(prompt_id: str):
+        return {prompt_id: history[prompt_id]} if prompt_id in history else {}
+
+    @app.get("/queue")
+    async def queue_get():
+        run = [[0, running["prompt_id"], {}, {}, []]] if running["prompt_id"] else []
+        return {"queue_running": run, "queue_pending": [[i, p[0], {}, {}, []] for i, p in enumerate(pending)]}
+
+    @app.post("/queue")
+    async def queue_post(body: Dict[str, Any]):
+        ids = set(body.get("delete") or [])
+        if body.get("clear"):
+            ids |= {p[0] for p in pending}
+        for p in [p for p in pending if p[0] in ids]:
+            pending.remove(p)
+        return {}
+
+    @app.post("/interrupt")
+    async def interrupt(request: Request):
+        try:
+            body = await request.json()
+        except Exception:
+            body = {}
+        target = (body or {}).get("prompt_id") or running["prompt_id"]
+        if target and target == running["prompt_id"]:
+            interrupted.add(target)
+        return JSONResponse({"interrupted": bool(target)})
+
+    @app.get("/view")
+    async def view(filename: str, subfolder: str = "", type: str = "output"):
+        return Response(b"\0" * output_bytes, media_type="application/octet-stream")
+
+    @app.get("/_stats")
+    async def stats():
+        return {"requests": dict(app.state.requests), "pending": len(pending), "sockets": len(sockets)}
+
+    @app.post("/_drop_ws")
+    async def drop_ws():
+        # 연결된 소켓을 서버 쪽에서 모두 끊음 → 클라이언트의 /history 폴링 대체 경로 확인용
+        dropped = list(sockets.values())
+        sockets.clear()
+        for ws in dropped:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        return {"dropped": len(dropped)}
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket, clientId: str = ""):
+        await websocket.accept()
+        sockets[clientId] = websocket
+        await _status()
+        try:
+            while True:
+                await websocket.receive_text()
+        except (WebSocketDisconnect, RuntimeError):   # RuntimeError: /_drop_ws 로 닫힌 소켓
+            if sockets.get(clientId) is websocket:
+                sockets.pop(clientId, None)
+
+    return app
+
+
+def start(port: int = 0, **kw) -> tuple[str, Any]:
+    # 백그라운드 스레드에서 uvicorn 실행. (base_url, server) 반환
+    import socket
+    import uvicorn
+
+    if not port:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(make_app(**kw), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8188)
+    ap.add_argument("--exec-ms", type=float, default=500.0)
+    ap.add_argument("--output-bytes", type=int, default=64 * 1024)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    a = ap.parse_args()
+    uvicorn.run(make_app(a.exec_ms, a.output_bytes, a.fail_rate), host="127.0.0.1", port=a.port)
@@ -0,0 +1,344 @@
+# load_test.py
+# 전 구간 부하 테스트: 대역 서버들을 띄우고 브리지 엔드포인트를 목표 RPS로 두드린 뒤 결과를 JSON으로 남긴다.
+#   - Gemini generateContent  : stubs.start_gemini (지연/실패율)
+#   - ComfyUI                 : fake_comfy (백엔드 K대, 실행 시간/실패율)
+#   - S3                      : moto 서버 (ThreadedMotoServer)
+#   - Kafka                   : stubs.MockProducer (브리지 프로세스 안에서 교체)
+# 브리지/제너레이터는 각각 별도 프로세스로 띄워 RSS/스레드 수를 따로 잰다.
+#   python AI/bench/load_test.py --duration 30 --rps generate-media=50,veo3-generate=5,comments=10 --out bench.json
+# 결과 JSON끼리 diff 해서 변경 전후를 비교한다.
+import os, sys
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.dirname(BENCH_DIR)
+PROMPT_DIR = os.path.join(AI_DIR, "AI", "prompt")
+sys.path.append(AI_DIR)
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+import stubs
+
+WEATHER = {
+    "areaName": "Seoul", "temperature": "27", "humidity": "60", "uvIndex": "5",
+    "congestionLevel": "busy", "maleRate": "48", "femaleRate": "52", "teenRate": "8",
+    "twentyRate": "30", "thirtyRate": "25", "fortyRate": "17", "fiftyRate": "10",
+    "sixtyRate": "6", "seventyRate": "4",
+}
+COMMENTS = {
+    "topic": {"video_id": "bench", "title": "bench video"},
+    "comments": [{"rank": i, "text": f"comment {i}", "likes_or_score": 10 - i, "replies": 0} for i in range(10)],
+}
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_status(pid: int) -> dict:
+    out = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                k, _, v = line.partition(":")
+                if k in ("VmRSS", "VmHWM"):
+                    out[k] = int(v.split()[0]) / 1024.0
+                elif k == "Threads":
+                    out[k] = int(v)
+    except OSError:
+        pass
+    return out
+
+
+# -------------------
+# 서버 프로세스
+# -------------------
+def serve(which: str, port: int) -> None:
+    # 자식 프로세스 진입점: 브리지는 Kafka 대역을 끼운 뒤 import
+    import uvicorn
+
+    if which == "bridge":
+        stubs.install_kafka_mock()
+        uvicorn.run("bridge.app:app", host="127.0.0.1", port=port, log_level="warning")
+    else:
+        sys.path.append(PROMPT_DIR)
+        uvicorn.run("generator_server:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def _spawn(which: str, port: int, env: dict, log_dir: str) -> subprocess.Popen:
+    log = open(os.path.join(log_dir, f"{which}.log"), "w")
+    return subprocess.Popen([sys.executable, __file__, "--serve", which, "--port", str(port)],
+                            env=env, cwd=AI_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} 프로세스가 종료됨 (exit={proc.returncode})")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} 준비 시간 초과")
+
+
+def _start_moto() -> str:
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+
+# -------------------
+# 부하 생성
+# -------------------
+class Endpoint:
+    def __init__(self, name: str, path: str, rps: float):
+        self.name, self.path, self.rps = name, path, rps
+        self.latencies: list[float] = []
+        self.status: dict[str, int] = {}
+        self.sent = 0
+
+    def body(self, i: int) -> dict:
+        job_id = random.randint(1, 2**31 - 1)   # 멱등 키가 겹치지 않도록
+        if self.name == "generate-media":
+            return {"img": "bench/base.png", "jobId": job_id, "platform": random.choice(("reddit", "youtube")),
+                    "isclient": False, "weather": WEATHER}
+        if self.name == "veo3-generate":
+            return {"img": "", "UUID": f"bench-{i}-{job_id}", "jobId": job_id, "platform": "youtube",
+                    "weather": WEATHER}
+        return COMMENTS
+
+    def summary(self, wall: float) -> dict:
+        ok = sum(n for code, n in self.status.items() if code.startswith("2"))
+        return {
+            "target_rps": self.rps, "sent": self.sent, "ok": ok, "status": dict(sorted(self.status.items())),
+            "throughput_rps": round(ok / wall, 2),
+            "p50_ms": round(_pct(self.latencies, 50), 2), "p90_ms": round(_pct(self.latencies, 90), 2),
+            "p99_ms": round(_pct(self.latencies, 99), 2),
+            "max_ms": round(max(self.latencies), 2) if self.latencies else 0.0,
+        }
+
+
+async def drive(base_url: str, endpoints: list[Endpoint], duration: float) -> float:
+    # open-loop: 응답을 기다리지 않고 정해진 간격마다 보낸다 (느려져도 부하가 줄지 않음)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=1000)) as cli:
+        tasks: set[asyncio.Task] = set()
+
+        async def one(ep: Endpoint, i: int):
+            t0 = time.perf_counter()
+            try:
+                r = await cli.post(ep.path, json=ep.body(i))
+                code = str(r.status_code)
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            ep.latencies.append((time.perf_counter() - t0) * 1000.0)
+            ep.status[code] = ep.status.get(code, 0) + 1
+
+        async def pace(ep: Endpoint):
+            t_start = time.perf_counter()
+            i = 0
+            while True:
+                t_next = t_start + i / ep.rps
+                if t_next - t_start >= duration:
+                    return
+                await asyncio.sleep(max(t_next - time.perf_counter(), 0))
+                ep.sent += 1
+                task = asyncio.create_task(one(ep, i))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                i += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(pace(ep) for ep in endpoints if ep.rps > 0))
+        await asyncio.gather(*list(tasks))
+        return time.perf_counter() - t0
+
+
+async def sample_procs(procs: dict[str, subprocess.Popen], peaks: dict, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        for name, p in procs.items():
+            st = _proc_status(p.pid)
+            peak = peaks.setdefault(name, {"rss_peak_mb": 0.0, "threads_peak": 0})
+            peak["rss_peak_mb"] = round(max(peak["rss_peak_mb"], st.get("VmRSS", 0.0)), 1)
+            peak["threads_peak"] = max(peak["threads_peak"], st.get("Threads", 0))
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+def summarize_metrics(text: str) -> dict:
+    # /metrics 히스토그램을 시계열별 count/mean/p50/p99(버킷 보간)로 요약
+    buckets: dict[str, list[tuple[float, float]]] = {}
+    sums: dict[str, float] = {}
+    counts: dict[str, float] = {}
+    pat = re.compile(r'^(\w+?)_(bucket|sum|count)(\{[^}]*\})? ([0-9.eE+-]+)$')
+    for line in text.splitlines():
+        m = pat.match(line)
+        if not m:
+            continue
+        name, kind, labels, value = m.group(1), m.group(2), m.group(3) or "", float(m.group(4))
+        le = re.search(r'le="([^"]+)"', labels)
+        series = name + re.sub(r',?le="[^"]+"', "", labels).replace("{}", "")
+        if kind == "bucket" and le:
+            buckets.setdefault(series, []).append((float("inf") if le.group(1) == "+Inf" else float(le.group(1)), value))
+        elif kind == "sum":
+            sums[series] = value
+        elif kind == "count":
+            counts[series] = value
+
+    def quantile(q: float, bs: list[tuple[float, float]]) -> float:
+        total = bs[-1][1]
+        if not total:
+            return 0.0
+        rank, prev_le, prev_c = q * total, 0.0, 0.0
+        for le, c in bs:
+            if c >= rank:
+                if le == float("inf"):
+                    return prev_le
+                return prev_le + (le - prev_le) * ((rank - prev_c) / max(c - prev_c, 1e-9))
+            prev_le, prev_c = le, c
+        return prev_le
+
+    out = {}
+    for series, bs in sorted(buckets.items()):
+        n = counts.get(series, 0)
+        if not n:
+            continue
+        out[series] = {"count": int(n), "mean": round(sums.get(series, 0.0) / n, 4),
+                       "p50": round(quantile(0.5, bs), 4), "p99": round(quantile(0.99, bs), 4)}
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--serve", choices=["bridge", "generator"])
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--rps", default="generate-media=50,veo3-generate=5,comments=10")
+    ap.add_argument("--gemini-ms", type=float, default=200.0)
+    ap.add_argument("--gemini-fail", type=float, default=0.0)
+    ap.add_argument("--comfy-ms", type=float, default=500.0)
+    ap.add_argument("--comfy-fail", type=float, default=0.0)
+    ap.add_argument("--comfy-backends", type=int, default=1)
+    ap.add_argument("--kafka-rtt-ms", type=float, default=stubs.MOCK_KAFKA_RTT_MS)
+    ap.add_argument("--drain-s", type=float, default=10.0, help="부하 종료 후 콜백을 기다리는 시간")
+    ap.add_argument("--out", default="bench-result.json")
+    a = ap.parse_args()
+
+    if a.serve:
+        stubs.MOCK_KAFKA_RTT_MS = float(os.getenv("MOCK_KAFKA_RTT_MS", stubs.MOCK_KAFKA_RTT_MS))
+        serve(a.serve, a.port)
+        return
+
+    import fake_comfy
+
+    random.seed(0)
+    rps = {k: float(v) for k, v in (kv.split("=") for kv in a.rps.split(",") if kv)}
+    log_dir = tempfile.mkdtemp(prefix="loadtest-")
+
+    gemini = stubs.start_gemini(latency_ms=a.gemini_ms, fail_rate=a.gemini_fail)
+    comfy_urls = [fake_comfy.start(exec_ms=a.comfy_ms, fail_rate=a.comfy_fail)[0] for _ in range(a.comfy_backends)]
+    moto_url = _start_moto()
+    bridge_port, gen_port = _free_port(), _free_port()
+    bridge_url, gen_url = f"http://127.0.0.1:{bridge_port}", f"http://127.0.0.1:{gen_port}"
+
+    base_env = {**os.environ, "AWS_ENDPOINT_URL": moto_url, "AWS_ACCESS_KEY_ID": "bench",
+                "AWS_SECRET_ACCESS_KEY": "bench", "AWS_DEFAULT_REGION": "us-east-1"}
+    import boto3
+    s3 = boto3.client("s3", endpoint_url=moto_url, region_name="us-east-1",
+                      aws_access_key_id="bench", aws_secret_access_key="bench")
+    for bucket in ("bench-img", "bench-video"):
+        s3.create_bucket(Bucket=bucket)
+
+    gen_env = {**base_env, "GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img",
+               "S3_VIDEO_BUCKET": "bench-video", "S3_REGION": "us-east-1",
+               "COMFY_BASE_URLS": ",".join(comfy_urls), "BRIDGE_CALLBACK_URL": f"{bridge_url}/api/media/callback",
+               "COMFY_OUTPUT_SINK": "s3", "LOCAL_OUTPUT_DIR": os.path.join(log_dir, "output")}
+    bridge_env = {**base_env, "GOOGLE_API_KEY": "bench", "GEMINI_BASE_URL": stubs.url(gemini),
+                  "GENERATOR_ENDPOINT": f"{gen_url}/api/generate-media", "KAFKA_BOOTSTRAP": "mock:9092",
+                  "TTL_SECONDS": os.getenv("TTL_SECONDS", "600"),
+                  "WORKER_CONCURRENCY": os.getenv("WORKER_CONCURRENCY", "256"),
+                  "IDEMP_BACKEND": "memory", "LLM_CACHE_BACKEND": os.getenv("LLM_CACHE_BACKEND", "off"),
+                  "MOCK_KAFKA_RTT_MS": str(a.kafka_rtt_ms)}
+
+    procs = {"generator": _spawn("generator", gen_port, gen_env, log_dir),
+             "bridge": _spawn("bridge", bridge_port, bridge_env, log_dir)}
+    try:
+        _wait_ready(f"{gen_url}/comfy/stats", procs["generator"])
+        _wait_ready(f"{bridge_url}/healthz", procs["bridge"])
+        idle = {name: _proc_status(p.pid) for name, p in procs.items()}
+
+        endpoints = [Endpoint(name, f"/api/{name}", rate) for name, rate in rps.items()]
+
+        async def run() -> tuple[float, dict]:
+            peaks: dict = {}
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample_procs(procs, peaks, stop))
+            wall = await drive(bridge_url, endpoints, a.duration)
+            await asyncio.sleep(a.drain_s)
+            stop.set()
+            await sampler
+            return wall, peaks
+
+        wall, peaks = asyncio.run(run())
+        final = {name: _proc_status(p.pid) for name, p in procs.items()}
+        queue_stats = httpx.get(f"{bridge_url}/queue/stats", timeout=10).json()
+        metrics_text = httpx.get(f"{bridge_url}/metrics", timeout=10).text
+        veo_stats = httpx.get(f"{gen_url}/veo/stats", timeout=10).json()
+        comfy_stats = httpx.get(f"{gen_url}/comfy/stats", timeout=10).json()
+    finally:
+        for p in procs.values():
+            p.terminate()
+        for p in procs.values():
+            try:
+                p.wait(10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        gemini.shutdown()
+
+    result = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(a).items() if k not in ("serve", "port", "out")},
+        "wall_s": round(wall, 2),
+        "endpoints": {ep.name: ep.summary(wall) for ep in endpoints},
+        "processes": {name: {"rss_idle_mb": round(idle[name].get("VmRSS", 0.0), 1), **peaks.get(name, {}),
+                             "rss_final_mb": round(final[name].get("VmRSS", 0.0), 1),
+                             "threads_final": final[name].get("Threads", 0)} for name in procs},
+        "bridge": {"queue": queue_stats, "metrics": summarize_metrics(metrics_text)},
+        "generator": {"comfy": comfy_stats, "veo": veo_stats},
+        "logs": log_dir,
+    }
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(json.dumps({"endpoints": result["endpoints"], "processes": result["processes"]}, indent=2))
+    print(f"→ {a.out}")
+
+
+if __name__ == "__main__":
+    main()
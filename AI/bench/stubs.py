@@ -0,0 +1,314 @@
+# stubs.py
+# 벤치마크용 로컬 대역 서버 (표준 라이브러리만 사용)
+#   - Gemini generateContent
+#   - generator_server /api/generate-media (202만 돌려줌)
+#   - 영상 다운로드 URI (GET 으로 size 바이트를 청크 스트리밍, 대역폭 제한 가능)
+#   - confluent_kafka.Producer 인프로세스 대역 (MockProducer)
+#   python stubs.py gemini --port 18080 --latency-ms 50
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+WB_TEXT = " ".join(
+    "<WB>" + " ".join(f"word{i}" for i in range(18)) + "</WB>" for _ in range(3)
+)
+JSON_TEXT = json.dumps({
+    "subject": "city", "Action": None, "Style": None,
+    "Camera positioning and motion": None, "Composition": None,
+    "Focus and lens effects": None, "Ambiance": None,
+})
+
+
+class _Handler:
+    """공통: 지연/실패율 주입, JSON 응답. 응답 본문만 정하고 전송은 _AsyncServer가 한다."""
+    latency_s = 0.0
+    fail_rate = 0.0
+
+    @classmethod
+    def respond(cls, body: str) -> tuple[int, dict]:
+        raise NotImplementedError
+
+
+def _top3(envelope: dict) -> dict:
+    yt = envelope.get("youtube") or {}
+    return {
+        "video_id": yt.get("videoId") or "",
+        "top comments": [{"rank": "1", "platform": "youtube", "author": None, "text": "stub",
+                          "likes_or_score": "1", "replies": "0"}],
+        "atmosphere": "stub",
+    }
+
+
+class _GeminiHandler(_Handler):
+    bad_batch_rate = 0.0   # 배치 응답에서 문서 하나를 빼먹는 비율 (폴백 경로 확인용)
+
+    @classmethod
+    def respond(cls, body: str) -> tuple[int, dict]:
+        if "top comments" in body:
+            # /api/comments: contents[1]이 봉투(JSON) 또는 {"documents": [...]}
+            doc = json.loads(json.loads(body)["contents"][1]["parts"][0]["text"])
+            if "documents" in doc:
+                results = [{"id": d["id"], "result": _top3(d["input"])} for d in doc["documents"]]
+                if cls.bad_batch_rate and random.random() < cls.bad_batch_rate:
+                    results.pop()
+                text = json.dumps({"results": results}, ensure_ascii=False)
+            else:
+                text = json.dumps(_top3(doc), ensure_ascii=False)
+        else:
+            text = WB_TEXT if "<WB>" in body else JSON_TEXT
+        # 토큰 수는 글자 수/4 로 근사
+        usage = {"promptTokenCount": len(body) // 4, "candidatesTokenCount": len(text) // 4}
+        return 200, {"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": usage}
+
+
+class _GeneratorHandler(_Handler):
+    @classmethod
+    def respond(cls, body: str) -> tuple[int, dict]:
+        return 202, {"ok": True}
+
+
+class _AsyncServer:
+    """asyncio 기반 HTTP/1.1(keep-alive) 서버. 지연은 asyncio.sleep이라 스레드 하나로 동시 요청 수천 개를 받는다.
+    (ThreadingHTTPServer는 요청마다 스레드를 띄워 ~90 rps에서 먼저 포화돼 벤치가 대역 서버를 재게 된다)"""
+
+    def __init__(self, handler: type, port: int):
+        self.handler = handler
+        self.calls = 0
+        self._loop = asyncio.new_event_loop()
+        self._server: Optional[asyncio.Server] = None
+        self._conns: set[asyncio.Task] = set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = threading.Event()
+        self._port = port
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._conn, "127.0.0.1", self._port, backlog=4096))
+        self.server_address = self._server.sockets[0].getsockname()
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._conns.add(task)
+        try:
+            while True:
+                if not await reader.readline():   # 요청 줄 (메서드/경로는 보지 않음)
+                    break
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = line.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length") or 0)
+                body = (await reader.readexactly(n)).decode("utf-8", "replace") if n else ""
+                self.calls += 1
+                h = self.handler
+                if h.latency_s:
+                    await asyncio.sleep(h.latency_s)
+                if h.fail_rate and random.random() < h.fail_rate:
+                    code, obj = 503, {"error": {"message": "fake overload"}}
+                else:
+                    code, obj = h.respond(body)
+                raw = json.dumps(obj).encode("utf-8")
+                writer.write(f"HTTP/1.1 {code} {HTTPStatus(code).phrase}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(raw)}\r\n\r\n"
+                             .encode("latin-1") + raw)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._conns.discard(task)
+
+    async def _close(self) -> None:
+        # listen 소켓 닫기 → keep-alive 연결 태스크 취소 → 정리가 끝난 뒤에야 루프 정지
+        self._server.close()
+        for t in list(self._conns):
+            t.cancel()
+        await asyncio.gather(*self._conns, return_exceptions=True)
+        await self._server.wait_closed()
+        self._loop.stop()
+
+    def shutdown(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop)
+        self._thread.join(timeout=5)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024   # 동시 접속 수백 개에서 listen backlog가 모자라지 않도록
+
+
+def _start(base: type, port: int, latency_ms: float, fail_rate: float) -> _AsyncServer:
+    handler = type(base.__name__, (base,), {"latency_s": latency_ms / 1000.0, "fail_rate": fail_rate})
+    return _AsyncServer(handler, port)
+
+
+class _BlobHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    size = 0
+    mbps = 0.0   # 0이면 제한 없음
+    chunk = 1024 * 1024
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        self.server.calls += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(self.size))
+        self.end_headers()
+        block = b"\0" * self.chunk
+        sent = 0
+        t0 = time.perf_counter()
+        while sent < self.size:
+            n = min(self.chunk, self.size - sent)
+            self.wfile.write(block[:n])
+            sent += n
+            if self.mbps:
+                ahead = sent / (self.mbps * 1024 * 1024) - (time.perf_counter() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+def start_blob(port: int = 0, size_bytes: int = 64 * 1024 * 1024, mbps: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("_BlobHandler", (_BlobHandler,), {"size": size_bytes, "mbps": mbps})
+    srv = _Server(("127.0.0.1", port), handler)
+    srv.calls = 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def start_gemini(port: int = 0, latency_ms: float = 0.0, fail_rate: float = 0.0,
+                 bad_batch_rate: float = 0.0) -> _AsyncServer:
+    base = type("_GeminiHandler", (_GeminiHandler,), {"bad_batch_rate": bad_batch_rate})
+    return _start(base, port, latency_ms, fail_rate)
+
+
+def start_generator(port: int = 0, latency_ms: float = 0.0, fail_rate: float = 0.0) -> _AsyncServer:
+    return _start(_GeneratorHandler, port, latency_ms, fail_rate)
+
+
+def url(srv) -> str:
+    return f"http://127.0.0.1:{srv.server_address[1]}"
+
+
+# -------------------
+# Kafka
+# -------------------
+MOCK_KAFKA_RTT_MS = 5.0   # 브로커 왕복 시간 (배치 하나당)
+
+
+class _MockMsg:
+    def __init__(self, topic: str, offset: int):
+        self._topic, self._offset = topic, offset
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return self._offset
+
+
+class MockProducer:
+    """confluent_kafka.Producer 대역. linger.ms 마다 쌓인 메시지를 한 배치로 보내고
+    배치당 MOCK_KAFKA_RTT_MS 만큼 기다린 뒤 ack. 콜백은 poll()/flush() 호출 스레드에서 실행."""
+
+    def __init__(self, conf: dict):
+        self.linger_s = float(conf.get("linger.ms", 5)) / 1000.0
+        self._pending: list[tuple[str, object]] = []
+        self._acked: list[tuple[object, _MockMsg]] = []
+        self._cv = threading.Condition()
+        self._offset = 0
+        self._sending = 0
+        self.batches = 0
+        threading.Thread(target=self._broker, daemon=True).start()
+
+    def _broker(self):
+        while True:
+            time.sleep(self.linger_s)
+            with self._cv:
+                batch, self._pending = self._pending, []
+                self._sending = len(batch)
+            if not batch:
+                continue
+            time.sleep(MOCK_KAFKA_RTT_MS / 1000.0)
+            with self._cv:
+                self._sending = 0
+                for topic, cb in batch:
+                    self._offset += 1
+                    self._acked.append((cb, _MockMsg(topic, self._offset)))
+                self.batches += 1
+                self._cv.notify_all()
+
+    def produce(self, topic, key=None, value=None, callback=None, **kw):
+        with self._cv:
+            self._pending.append((topic, callback))
+
+    def poll(self, timeout: float = 0) -> int:
+        with self._cv:
+            if not self._acked and timeout:
+                self._cv.wait(timeout)
+            ready, self._acked = self._acked, []
+        for cb, msg in ready:
+            if cb:
+                cb(None, msg)
+        return len(ready)
+
+    def flush(self, timeout: float = -1) -> int:
+        deadline = time.monotonic() + (timeout if timeout >= 0 else 1e9)
+        while len(self) and time.monotonic() < deadline:
+            self.poll(0.05)
+        return len(self)
+
+    def __len__(self):
+        with self._cv:
+            return len(self._pending) + self._sending + len(self._acked)
+
+
+def install_kafka_mock() -> None:
+    # bridge.app import 전에 호출: confluent_kafka 대신 MockProducer 사용
+    import sys, types
+    mod = types.ModuleType("confluent_kafka")
+    mod.Producer = MockProducer
+    sys.modules["confluent_kafka"] = mod
+
+
+STUBS = {"gemini": start_gemini, "generator": start_generator}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("stub", choices=sorted(STUBS))
+    ap.add_argument("--port", type=int, default=18080)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    a = ap.parse_args()
+    s = STUBS[a.stub](a.port, a.latency_ms, a.fail_rate)
+    print(f"fake {a.stub} on {url(s)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        s.shutdown()
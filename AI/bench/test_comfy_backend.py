@@ -0,0 +1,158 @@
+# test_comfy_backend.py
+# ComfyBackend 완료 감지/실패/취소를 fake_comfy 로 확인
+#   python -m pytest -q AI/bench/test_comfy_backend.py
+import os, sys, tempfile
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "AI", "prompt"))
+for k, v in {"GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img", "S3_VIDEO_BUCKET": "bench-video",
+             "S3_REGION": "us-east-1", "LOCAL_OUTPUT_DIR": tempfile.mkdtemp()}.items():
+    os.environ.setdefault(k, v)
+
+import asyncio
+
+import httpx
+import pytest
+
+import fake_comfy
+import generator_server as gs
+
+WORKFLOW = {"1": {"class_type": "SaveImage", "inputs": {}}}
+
+
+@pytest.fixture(autouse=True)
+def _fast_poll(monkeypatch):
+    monkeypatch.setattr(gs, "POLL_INTERVAL", 0.1)
+    monkeypatch.setattr(gs, "COMFY_WS_RECONNECT_S", 60.0)   # 끊긴 뒤에는 폴링으로만 완료를 받도록
+
+
+def _serve(**kw):
+    base_url, server = fake_comfy.start(**kw)
+    yield base_url
+    server.should_exit = True
+
+
+@pytest.fixture(scope="module")
+def comfy_url():
+    yield from _serve(exec_ms=100)
+
+
+@pytest.fixture(scope="module")
+def failing_url():
+    yield from _serve(exec_ms=50, fail_rate=1.0)
+
+
+@pytest.fixture(scope="module")
+def slow_url():
+    yield from _serve(exec_ms=1500)
+
+
+def _run(base_url: str, body, use_ws: bool = True):
+    # 백엔드 하나를 띄워 body(backend)를 실행하고 정리
+    async def main():
+        gs.COMFY_WS_ENABLED = use_ws
+        backend = gs.ComfyBackend(base_url)
+        backend.start()
+        try:
+            if use_ws:
+                await _until(lambda: backend.ws_connected)
+            return await body(backend)
+        finally:
+            await backend.stop()
+    return asyncio.run(main())
+
+
+async def _until(cond, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+async def _history_requests(base_url: str) -> dict:
+    async with httpx.AsyncClient() as cli:
+        reqs = (await cli.get(f"{base_url}/_stats")).json()["requests"]
+    return {"bulk": reqs.get("GET history", 0), "one": reqs.get("GET history_one", 0)}
+
+
+def test_ws_completion_fetches_history_once(comfy_url, monkeypatch):
+    monkeypatch.setattr(gs, "POLL_INTERVAL", 5.0)   # 완료는 WS 이벤트로만
+
+    async def body(backend):
+        before = await _history_requests(comfy_url)
+        pid = await backend.submit(WORKFLOW)
+        entry = await backend.wait(pid, timeout=10)
+        await asyncio.sleep(0.2)   # execution_success 뒤의 executing(node=None)까지 처리되도록
+        after = await _history_requests(comfy_url)
+        return pid, entry, {k: after[k] - before[k] for k in after}
+
+    pid, entry, delta = _run(comfy_url, body)
+    assert gs._pick_output(entry, ".png")["filename"] == f"{pid}.png"
+    assert delta == {"bulk": 0, "one": 1}
+
+
+def test_polling_fallback_after_ws_disconnect(comfy_url):
+    async def body(backend):
+        async with httpx.AsyncClient() as cli:
+            assert (await cli.post(f"{comfy_url}/_drop_ws")).json()["dropped"] >= 1
+        await _until(lambda: not backend.ws_connected)
+        pid = await backend.submit(WORKFLOW)
+        entry = await backend.wait(pid, timeout=10)
+        return pid, entry, backend.ws_connected
+
+    pid, entry, connected = _run(comfy_url, body)
+    assert not connected
+    assert gs._pick_output(entry, ".png")["filename"] == f"{pid}.png"
+
+
+def test_polling_only_completion(comfy_url):
+    async def body(backend):
+        pid = await backend.submit(WORKFLOW)
+        return pid, await backend.wait(pid, timeout=10)
+
+    pid, entry = _run(comfy_url, body, use_ws=False)
+    assert entry["status"]["completed"] is True
+
+
+@pytest.mark.parametrize("use_ws", [True, False])
+def test_execution_failure_raises(failing_url, use_ws):
+    async def body(backend):
+        pid = await backend.submit(WORKFLOW)
+        await backend.wait(pid, timeout=10)
+
+    with pytest.raises(RuntimeError, match="fake failure"):
+        _run(failing_url, body, use_ws=use_ws)
+
+
+def test_cancel_pending_prompt_leaves_running_one(slow_url):
+    async def body(backend):
+        running = await backend.submit(WORKFLOW)
+        queued = await backend.submit(WORKFLOW)
+        assert await backend.cancel(queued)
+        async with httpx.AsyncClient() as cli:
+            q = (await cli.get(f"{slow_url}/queue")).json()
+        assert [item[1] for item in q["queue_running"]] == [running]
+        assert q["queue_pending"] == []
+        entry = await backend.wait(running, timeout=10)
+        assert not await backend.cancel(running)   # 이미 끝난 prompt
+        return entry
+
+    assert _run(slow_url, body)["status"]["completed"] is True
+
+
+def test_cancel_running_prompt_interrupts_only_it(slow_url):
+    async def body(backend):
+        victim = await backend.submit(WORKFLOW)
+        other = await backend.submit(WORKFLOW)
+        async with httpx.AsyncClient() as cli:
+            for _ in range(100):   # victim이 실행 중일 때 취소해야 /interrupt 경로를 탄다
+                q = (await cli.get(f"{slow_url}/queue")).json()
+                if [item[1] for item in q["queue_running"]] == [victim]:
+                    break
+                await asyncio.sleep(0.02)
+        assert await backend.cancel(victim)
+        with pytest.raises(RuntimeError, match="interrupted"):
+            await backend.wait(victim, timeout=10)
+        return await backend.wait(other, timeout=10)
+
+    assert _run(slow_url, body)["status"]["completed"] is True
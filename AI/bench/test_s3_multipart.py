@@ -0,0 +1,100 @@
+# test_s3_multipart.py
+# S3MultipartWriter 업로드/abort 를 moto 서버(ThreadedMotoServer)로 확인
+#   python -m pytest -q AI/bench/test_s3_multipart.py
+import os, sys, tempfile
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "AI", "prompt"))
+for k, v in {"GEMINI_API_KEY": "bench", "S3_IMAGE_BUCKET": "bench-img", "S3_VIDEO_BUCKET": "bench-video",
+             "S3_REGION": "us-east-1", "LOCAL_OUTPUT_DIR": tempfile.mkdtemp()}.items():
+    os.environ.setdefault(k, v)
+
+import asyncio
+import logging
+
+import boto3
+import pytest
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+import generator_server as gs
+
+BUCKET = "test-multipart"
+PART = 5 * 1024 * 1024   # S3 최소 part 크기
+
+
+@pytest.fixture(scope="module")
+def moto_s3():
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    s3 = boto3.client("s3", region_name="us-east-1", endpoint_url=f"http://{host}:{port}",
+                      aws_access_key_id="test", aws_secret_access_key="test",
+                      config=BotoConfig(signature_version="s3v4"))
+    s3.create_bucket(Bucket=BUCKET)
+    yield s3
+    server.stop()
+
+
+@pytest.fixture
+def s3(moto_s3, monkeypatch):
+    monkeypatch.setattr(gs, "s3_client", moto_s3)
+    return moto_s3
+
+
+class _FailingPart:
+    """moto 클라이언트 그대로 쓰되 지정한 part 번호의 upload_part만 실패시킴."""
+
+    def __init__(self, s3, part_number: int):
+        self._s3, self._part_number = s3, part_number
+
+    def __getattr__(self, name):
+        return getattr(self._s3, name)
+
+    def upload_part(self, **kw):
+        if kw["PartNumber"] == self._part_number:
+            raise ClientError({"Error": {"Code": "InternalError", "Message": "injected"}}, "UploadPart")
+        return self._s3.upload_part(**kw)
+
+
+async def _upload(key: str, data: bytes, chunk: int = 1024 * 1024) -> int:
+    async with gs.S3MultipartWriter(BUCKET, key, "video/mp4", part_size=PART, concurrency=2) as w:
+        for i in range(0, len(data), chunk):
+            await w.write(data[i:i + chunk])
+    return w.bytes_written
+
+
+def test_multipart_upload_roundtrip(s3):
+    data = os.urandom(2 * PART + 123)   # part 2개 + 짧은 마지막 part
+    assert asyncio.run(_upload("ok.mp4", data)) == len(data)
+    assert s3.get_object(Bucket=BUCKET, Key="ok.mp4")["Body"].read() == data
+
+
+def test_small_file_uses_put_object(s3):
+    data = b"x" * 1000
+    asyncio.run(_upload("small.mp4", data))
+    assert s3.get_object(Bucket=BUCKET, Key="small.mp4")["Body"].read() == data
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+
+
+def test_failed_part_aborts_upload(s3, monkeypatch):
+    monkeypatch.setattr(gs, "s3_client", _FailingPart(s3, part_number=2))
+    with pytest.raises(ClientError, match="injected"):
+        asyncio.run(_upload("broken.mp4", os.urandom(3 * PART)))
+    # 남은 멀티파트가 없어야 하고 객체도 생기지 않아야 함
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    with pytest.raises(ClientError):
+        s3.head_object(Bucket=BUCKET, Key="broken.mp4")
+
+
+def test_stream_error_aborts_upload(s3):
+    async def body():
+        async with gs.S3MultipartWriter(BUCKET, "cut.mp4", "video/mp4", part_size=PART) as w:
+            await w.write(os.urandom(PART + 10))
+            raise ConnectionError("download cut")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(body())
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
@@ -4,18 +4,27 @@ sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 import os, json, time, hmac, hashlib, threading, uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Any, Dict
-from queue import PriorityQueue
 
 import httpx
 import asyncio
 from fastapi import FastAPI, Header, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import ValidationError
 from confluent_kafka import Producer
 from contextlib import asynccontextmanager
-from bridge.llm_client import summarize_to_english, summarize_top3_text, extract_keyword, veoprompt_generate
+from bridge.llm_client import (
+    summarize_to_english_async, summarize_top3_text_async, summarize_top3_batch_async,
+    extract_keyword, veoprompt_generate,
+    open_http_pool, close_http_pool, llm_call_stats, llm_cache_stats, comment_usage_stats,
+    AsyncClientShards,
+)
 from dotenv import load_dotenv
 from bridge.models import BridgeIn, VeoBridge
+from bridge.scheduler import JobScheduler
+from bridge.batcher import MicroBatcher
+from bridge.idempotency import make_idempotency_store
+from bridge.state import JobStateStore
+from bridge import logs, metrics, tracing
 load_dotenv()
 
 # -------------------
@@ -25,12 +34,24 @@ GENERATOR_ENDPOINT = os.getenv("GENERATOR_ENDPOINT")
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP")
 KAFKA_TOPIC      = os.getenv("KAFKA_TOPIC", "media-callback")
 TTL_SECONDS      = int(os.getenv("TTL_SECONDS", ""))
-WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", ""))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", ""))   # 동시에 처리 중인 잡 수 상한
+LLM_CONCURRENCY  = int(os.getenv("LLM_CONCURRENCY", "32"))
+GEN_CONCURRENCY  = int(os.getenv("GEN_CONCURRENCY", "32"))
+KAFKA_LINGER_MS  = int(os.getenv("KAFKA_LINGER_MS", "20"))
+KAFKA_BATCH_SIZE = int(os.getenv("KAFKA_BATCH_SIZE", "65536"))        # bytes
+KAFKA_POLL_INTERVAL_S = float(os.getenv("KAFKA_POLL_INTERVAL_S", "0.1"))
+KAFKA_FLUSH_TIMEOUT_S = float(os.getenv("KAFKA_FLUSH_TIMEOUT_S", "10"))
+STATE_SHARDS     = int(os.getenv("STATE_SHARDS", "16"))
+SWEEP_RESOLUTION_S = float(os.getenv("SWEEP_RESOLUTION_S", "1.0"))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "100"))
+LOOP_LAG_INTERVAL_S = float(os.getenv("LOOP_LAG_INTERVAL_S", "0.5"))
+COMMENTS_BATCH   = os.getenv("COMMENTS_BATCH", "1") != "0"   # /api/comments 마이크로배치
+COMMENTS_BATCH_WINDOW_MS = float(os.getenv("COMMENTS_BATCH_WINDOW_MS", "25"))
+COMMENTS_BATCH_MAX = int(os.getenv("COMMENTS_BATCH_MAX", "8"))
+COMMENTS_BATCH_MAX_CHARS = int(os.getenv("COMMENTS_BATCH_MAX_CHARS", "60000"))   # 한 프롬프트에 넣을 봉투 JSON 글자 수 상한
 SERIALIZE_BY_CALLBACK = True
 
-print("GENERATOR_ENDPOINT =", GENERATOR_ENDPOINT)
-print("KAFKA_BOOTSTRAP =", KAFKA_BOOTSTRAP)
-print("KAFKA_TOPIC =", KAFKA_TOPIC)
+logs.info("config", generatorEndpoint=GENERATOR_ENDPOINT, kafkaBootstrap=KAFKA_BOOTSTRAP, kafkaTopic=KAFKA_TOPIC)
 KST = timezone(timedelta(hours=9))
 
 # Kafka 설정
@@ -41,31 +62,62 @@ producer_conf = {
     "retries": 5,
     "message.send.max.retries": 5,
     "socket.timeout.ms": 30000,
+    "linger.ms": KAFKA_LINGER_MS,
+    "batch.size": KAFKA_BATCH_SIZE,
 }
 producer = Producer(producer_conf)
+kafka_stop = threading.Event()
+KAFKA_BUFFER_BACKOFF_S = (0.05, 0.1, 0.2, 0.4, 0.8)   # 로컬 큐가 찼을 때 재시도 간격
+kafka_retry_tasks: set[asyncio.Task] = set()
 
 # -------------------
 # State
 # -------------------
-job_queue: "PriorityQueue[tuple[int, dict]]" = PriorityQueue()
-inflight: Dict[str, Dict[str, Any]] = {}
-idemp_index: Dict[str, str] = {}
-completed: set[str] = set()
-printed: set[str] = set()
-lock = threading.Lock()
+# inflight 잡/마감 힙/카운터 (샤드별 락)
+state = JobStateStore(shards=STATE_SHARDS)
+# 무한히 커지지 않도록: 멱등 키는 TTL/용량 제한 저장소, 완료/로그 여부는 카운터와 잡 플래그로
+idemp_store = make_idempotency_store()
 
 def now_utc():
     return datetime.now(timezone.utc)
 
-def log_once(req_id: str, msg: str):
-    with lock:
-        if req_id not in printed:
-            print(msg)
-            printed.add(req_id)
+def log_once(job: dict, name: str, msg: str = "", **fields):
+    if not job.get("_logged"):
+        job["_logged"] = True
+        logs.info(name, msg, **fields)
+
+def register_inflight(req_id: str, job: dict, done_evt: threading.Event):
+    state.register(req_id, {
+        "jobId": job["jobId"],
+        "payload": job,
+        "deadline": now_utc() + timedelta(seconds=TTL_SECONDS),
+        "enqueuedAt": job.get("_enqueuedAt", now_utc().isoformat()),
+        "doneEvt": done_evt,
+    })
 
 def make_id():
     return "req_" + uuid.uuid4().hex
 
+def start_job_trace(job: dict, incoming: Optional[str]) -> None:
+    # 잡 전체 span의 컨텍스트를 미리 만들어 잡에 실어 둠 (끝은 콜백/만료 때 finish_job_trace)
+    job["_traceIncoming"] = incoming
+    job["_traceparent"] = tracing.new_context(tracing.parse_traceparent(incoming)).traceparent
+
+def job_trace(job: Optional[dict]) -> Optional[tracing.SpanContext]:
+    return tracing.parse_traceparent((job or {}).get("_traceparent"))
+
+def _iso_ns(ts: str) -> int:
+    return int(datetime.fromisoformat(ts).timestamp() * 1e9)
+
+def finish_job_trace(job: Optional[dict], status: str) -> None:
+    ctx = job_trace(job)
+    if ctx is None or not job.get("_enqueuedAt"):
+        return
+    tracing.record("bridge.job", tracing.parse_traceparent(job.get("_traceIncoming")),
+                   start_ns=_iso_ns(job["_enqueuedAt"]), context=ctx,
+                   requestId=job.get("requestId"), jobId=job.get("jobId"),
+                   platform=job.get("platform") or "", status=status)
+
 def body_hash(d: dict) -> str:
     payload = json.dumps(d, sort_keys=True, ensure_ascii=False).encode("utf-8")
     return hashlib.sha256(payload).hexdigest()
@@ -75,65 +127,117 @@ def hmac_ok(raw_body: bytes, signature: str, secret: str) -> bool:
     sig = signature.split("=", 1)[-1].strip() if "=" in signature else signature
     return hmac.compare_digest(mac, sig)
 
-def produce_kafka(event_key: str, value: dict):
+def produce_kafka(event_key: str, value: dict, trace_ctx: Optional[tracing.SpanContext] = None):
+    t0 = time.perf_counter()
+    t0_ns = time.time_ns()
+
     def delivery_report(err, msg):
+        metrics.KAFKA_DELIVERY.observe(time.perf_counter() - t0, outcome="error" if err is not None else "ok")
+        if trace_ctx is not None:
+            tracing.record("bridge.kafka_delivery", trace_ctx, start_ns=t0_ns,
+                           eventId=event_key, outcome="error" if err is not None else "ok")
         if err is not None:
-            print(f"[KAFKA_ERROR] Delivery failed for key={event_key}: {err}")
+            logs.error("kafka_error", "delivery failed", key=event_key, error=str(err))
         else:
-            print(f"[KAFKA_OK] Delivered to {msg.topic()} [{msg.partition()}] offset {msg.offset()}")
-
+            logs.info("kafka_ok", key=event_key, topic=msg.topic(), partition=msg.partition(), offset=msg.offset())
+
+    # 로컬 버퍼에 넣기만 하고 바로 반환. 전송/ack 콜백은 kafka_poller 스레드가 처리
+    kwargs = dict(
+        topic=KAFKA_TOPIC,
+        key=event_key,
+        value=json.dumps(value, ensure_ascii=False).encode("utf-8"),
+        callback=delivery_report
+    )
     try:
-        producer.produce(
-            topic=KAFKA_TOPIC,
-            key=event_key,
-            value=json.dumps(value, ensure_ascii=False).encode("utf-8"),
-            callback=delivery_report
-        )
-        producer.flush(5)
+        try:
+            producer.produce(**kwargs)
+        except BufferError:
+            # 로컬 큐가 가득 참 → kafka_poller가 비울 시간을 주고 다시 시도
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None:
+                # 루프 밖(스레드)에서 호출된 경우엔 여기서 기다려도 된다
+                producer.poll(1)
+                producer.produce(**kwargs)
+            else:
+                # 루프를 막지 않도록 재시도는 태스크에서 asyncio.sleep 백오프로
+                task = loop.create_task(_produce_after_backoff(event_key, kwargs))
+                kafka_retry_tasks.add(task)
+                task.add_done_callback(kafka_retry_tasks.discard)
     except Exception as e:
-        print(f"[KAFKA_EXCEPTION] {e}")
+        logs.error("kafka_exception", str(e), key=event_key)
+
+async def _produce_after_backoff(event_key: str, kwargs: dict):
+    for delay in KAFKA_BUFFER_BACKOFF_S:
+        await asyncio.sleep(delay)
+        try:
+            producer.produce(**kwargs)
+            return
+        except BufferError:
+            continue
+        except Exception as e:
+            logs.error("kafka_exception", str(e), key=event_key)
+            return
+    logs.error("kafka_exception", "local producer queue still full, event dropped", key=event_key)
+
+def kafka_poller():
+    # delivery 콜백 구동 전용 스레드 (flush는 종료 시 lifespan에서만)
+    while not kafka_stop.is_set():
+        producer.poll(KAFKA_POLL_INTERVAL_S)
 
 # -------------------
 # Worker
 # -------------------
-def worker_loop():
-    print("Worker thread started!")
-    while True:
-        prio, job = job_queue.get()
-        print(f"[Worker] (prio={prio}) Dequeued job {job['requestId']} for user {job['jobId']}")
-        attempts = job.get("_attempts", 0)
-        req_id = job["requestId"]
+gen_clients: Optional[AsyncClientShards] = None   # generator POST용 공유 풀
+
+def fallback_text(job: dict) -> str:
+    w = job.get("weather", {})
+    return (
+        f"{w.get('areaName','Unknown area')}: "
+        f"{w.get('temperature','?')}°C, humidity {w.get('humidity','?')}%, "
+        f"UV {w.get('uvIndex','?')}."
+    )
 
-        done_evt = threading.Event()
+async def llm_stage(job: dict, limited: bool = True) -> str:
+    req_id = job["requestId"]
+    english_text = job.get("_englishText")
+    if not english_text:
+        path = "queued" if limited else "direct"
+        t0 = time.perf_counter()
         try:
-            with lock:
-                inflight[req_id] = {
-                    "jobId": job["jobId"],
-                    "payload": job,
-                    "deadline": now_utc() + timedelta(seconds=TTL_SECONDS),
-                    "enqueuedAt": job.get("_enqueuedAt", now_utc().isoformat()),
-                    "doneEvt": done_evt,
-                }
+            with tracing.span("bridge.llm_summarize", path=path):
+                if limited:
+                    async with scheduler.stage("llm"):
+                        english_text = await summarize_to_english_async(job)
+                else:
+                    english_text = await summarize_to_english_async(job)
+            metrics.LLM_LATENCY.observe(time.perf_counter() - t0, path=path, outcome="ok")
+            log_once(job, "llm_ok", english_text, requestId=req_id)
+        except Exception as e:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - t0, path=path, outcome="fallback")
+            english_text = fallback_text(job)
+            log_once(job, "llm_fallback", english_text, requestId=req_id, error=str(e))
+        job["_englishText"] = english_text
+    state.update(req_id, englishText=english_text)
+    return english_text
+
+async def process_job(prio: int, job: dict):
+    logs.info("job_dequeued", requestId=job["requestId"], jobId=job["jobId"], prio=prio)
+    attempts = job.get("_attempts", 0)
+    req_id = job["requestId"]
+    trace_ctx = job_trace(job)
+    if attempts == 0 and job.get("_enqueuedAt"):
+        metrics.QUEUE_WAIT.observe((now_utc() - datetime.fromisoformat(job["_enqueuedAt"])).total_seconds())
+        tracing.record("bridge.queue_wait", trace_ctx, start_ns=_iso_ns(job["_enqueuedAt"]))
 
-            try:
-                english_text = job.get("_englishText")
-                if not english_text:
-                    english_text = summarize_to_english(job)
-                    job["_englishText"] = english_text
-                with lock:
-                    inflight[req_id]["englishText"] = english_text
-                log_once(req_id, f"[LLM_OK][{req_id}] {english_text}")
-            except Exception as e:
-                w = job.get("weather", {})
-                english_text = (
-                    f"{w.get('areaName','Unknown area')}: "
-                    f"{w.get('temperature','?')}°C, humidity {w.get('humidity','?')}%, "
-                    f"UV {w.get('uvIndex','?')}."
-                )
-                job["_englishText"] = english_text
-                with lock:
-                    inflight[req_id]["englishText"] = english_text
-                log_once(req_id, f"[LLM_FALLBACK][{req_id}] {english_text} | err={e}")
+    done_evt = threading.Event()
+    try:
+        with tracing.span("bridge.attempt", parent=trace_ctx, requestId=req_id, attempt=attempts + 1):
+            register_inflight(req_id, job, done_evt)
+
+            english_text = await llm_stage(job)
 
             # 2) 제너레이터 호출 (짧은 read 타임아웃 추천)
             if not GENERATOR_ENDPOINT:
@@ -149,59 +253,77 @@ def worker_loop():
                 "englishText": english_text,
             }
 
-            try:
-                with httpx.Client(timeout=to) as cli:
-                    r = cli.post(GENERATOR_ENDPOINT, json=gen_body)
+            outcome = "error"
+            async with scheduler.stage("generator"):
+                t0 = time.perf_counter()
+                try:
+                    with tracing.span("bridge.generator_post"):
+                        r = await gen_clients.next().post(GENERATOR_ENDPOINT, json=gen_body, timeout=to,
+                                                  headers=tracing.inject())
                     if r.status_code not in (200, 201, 202):
                         raise RuntimeError(f"GEN status={r.status_code} body={r.text[:200]}")
-            except httpx.ConnectError as ce:
-                print(f"[GEN_CONNECT_FAIL][{req_id}] {ce}")
-                raise
-            except httpx.ConnectTimeout as cte:
-                print(f"[GEN_CONNECT_TIMEOUT][{req_id}] {cte}")
-                raise
-            except httpx.ReadTimeout as rte:
-                print(f"[GEN_READ_TIMEOUT][{req_id}] {rte} (proceeding; will await callback or TTL)")
-                # 수락되었을 가능성이 있으니 재시도하지 않음
-            except Exception as ge:
-                print(f"[GEN_POST_FAIL][{req_id}] {ge}")
-                raise
+                    outcome = "ok"
+                except httpx.ConnectError as ce:
+                    logs.warning("gen_connect_fail", str(ce), requestId=req_id)
+                    raise
+                except httpx.ConnectTimeout as cte:
+                    logs.warning("gen_connect_timeout", str(cte), requestId=req_id)
+                    raise
+                except httpx.ReadTimeout as rte:
+                    logs.warning("gen_read_timeout", "proceeding; will await callback or TTL", requestId=req_id, error=str(rte))
+                    # 수락되었을 가능성이 있으니 재시도하지 않음
+                    outcome = "read_timeout"
+                except Exception as ge:
+                    logs.warning("gen_post_fail", str(ge), requestId=req_id)
+                    raise
+                finally:
+                    metrics.GEN_POST.observe(time.perf_counter() - t0, path="queued", outcome=outcome)
+            metrics.JOB_ATTEMPTS.observe(attempts + 1, outcome="accepted")
+
+    except asyncio.CancelledError:
+        state.pop(req_id)
+        raise
+    except Exception as e:
+        attempts += 1
+        state.pop(req_id)
+        if attempts <= 5:
+            # 백오프 동안 슬롯을 붙잡지 않도록 지연 재시도 큐로 넘김
+            sleep_s = min(2 ** attempts, 30) + (hash(req_id) % 1000)/1000.0
+            job["_attempts"] = attempts
+            metrics.RETRIES.inc()
+            scheduler.submit_later(prio, job, sleep_s)
+        else:
+            metrics.JOB_ATTEMPTS.observe(attempts, outcome="failed")
+            event = {
+                "eventId": f"evt_{req_id}_bridge_fail",
+                "requestId": req_id,
+                "jobId": job["jobId"],
+                "status": "FAILED",
+                "message": f"bridge->generator call failed after retries: {e}",
+                "createdAt": now_utc().isoformat()
+            }
+            produce_kafka(event["eventId"], event, trace_ctx)
+            finish_job_trace(job, "FAILED")
 
-        except Exception as e:
-            attempts += 1
-            with lock:
-                inflight.pop(req_id, None)
-            if attempts <= 5:
-                sleep_s = min(2 ** attempts, 30) + (hash(req_id) % 1000)/1000.0
-                time.sleep(sleep_s)
-                job["_attempts"] = attempts
-                job_queue.put((prio, job))
-            else:
-                event = {
-                    "eventId": f"evt_{req_id}_bridge_fail",
-                    "requestId": req_id,
-                    "jobId": job["jobId"],
-                    "status": "FAILED",
-                    "message": f"bridge->generator call failed after retries: {e}",
-                    "createdAt": now_utc().isoformat()
-                }
-                produce_kafka(event["eventId"], event)
-        finally:
-            job_queue.task_done()
+scheduler = JobScheduler(
+    process_job,
+    max_inflight=WORKER_CONCURRENCY,
+    stage_limits={"llm": LLM_CONCURRENCY, "generator": GEN_CONCURRENCY},
+)
 
-def expiry_sweeper():
+metrics.Gauge("bridge_jobs_queued", "Jobs waiting in the scheduler queue", lambda: scheduler.stats()["queued"])
+metrics.Gauge("bridge_jobs_running", "Jobs currently being processed", lambda: scheduler.stats()["running"])
+metrics.Gauge("bridge_jobs_inflight", "Jobs waiting for a generator callback", lambda: len(state))
+
+async def expiry_sweeper():
     while True:
-        time.sleep(30)
-        expired: list[str] = []
-        with lock:
-            for r, info in list(inflight.items()):
-                if now_utc() > info["deadline"]:
-                    expired.append(r)
-        for r in expired:
-            with lock:
-                info = inflight.pop(r, None)
-            if not info:
-                continue
+        next_deadline = state.next_deadline()
+        wait_s = SWEEP_RESOLUTION_S
+        if next_deadline is not None:
+            wait_s = min(wait_s, max((next_deadline - now_utc()).total_seconds(), 0.0))
+        await asyncio.sleep(wait_s)
+        for r, info in state.pop_expired(now_utc()):
+            finish_job_trace(info.get("payload"), "EXPIRED")
             event = {
                 "eventId": f"evt_{r}_expired",
                 "requestId": r,
@@ -212,24 +334,45 @@ def expiry_sweeper():
                 "createdAt": now_utc().isoformat()
             }
             produce_kafka(event["eventId"], event)
-        if expired:
-            producer.flush(5)
+
+async def loop_lag_monitor():
+    # 이벤트 루프가 LOOP_LAG_WARN_MS 이상 멈췄으면(동기 호출 등) 로그
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL_S)
+        lag_ms = (loop.time() - t0 - LOOP_LAG_INTERVAL_S) * 1000.0
+        if lag_ms > LOOP_LAG_WARN_MS:
+            logs.warning("loop_lag", "event loop stalled", lagMs=round(lag_ms), thresholdMs=LOOP_LAG_WARN_MS)
 
 # -------------------
 # Lifespan
 # -------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("앱 시작 준비 중...")
-    for _ in range(WORKER_CONCURRENCY):
-        threading.Thread(target=worker_loop, daemon=True).start()
-    threading.Thread(target=expiry_sweeper, daemon=True).start()
+    global gen_clients
+    logs.info("startup", "앱 시작 준비 중")
+    open_http_pool()
+    gen_clients = AsyncClientShards(GEN_CONCURRENCY)
+    scheduler.start()
+    threading.Thread(target=kafka_poller, daemon=True).start()
+    sweeper_task = asyncio.create_task(expiry_sweeper())
+    lag_task = asyncio.create_task(loop_lag_monitor())
     yield
-    print("앱 종료 중... (Kafka flush)")
+    lag_task.cancel()
+    sweeper_task.cancel()
+    await scheduler.stop()
+    await comment_batcher.close()
+    await gen_clients.aclose()
+    logs.info("shutdown", "앱 종료 중 (Kafka flush)")
+    if kafka_retry_tasks:
+        await asyncio.gather(*kafka_retry_tasks, return_exceptions=True)
+    kafka_stop.set()
     try:
-        producer.flush(5)
+        producer.flush(KAFKA_FLUSH_TIMEOUT_S)
     except Exception:
         pass
+    await close_http_pool()
 
 app = FastAPI(title="Bridge Server", lifespan=lifespan)
 
@@ -237,9 +380,10 @@ app = FastAPI(title="Bridge Server", lifespan=lifespan)
 # Endpoints
 # -------------------
 @app.post("/api/generate-media")
-def enqueue_generate_video(
+async def enqueue_generate_video(
     payload: BridgeIn,
-    idem_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+    idem_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    traceparent: Optional[str] = Header(default=None),
 ):
     try:
         data = payload.model_dump()
@@ -252,84 +396,69 @@ def enqueue_generate_video(
         "weather": data["weather"],
         "user": data.get("user")
     })
-    with lock:
-        if derived_key in idemp_index:
-            req_id = idemp_index[derived_key]
-            return JSONResponse(
-                {"requestId": req_id, "enqueued": True, "deduplicated": True},
-                status_code=202
-                )
-        req_id = make_id()
-        idemp_index[derived_key] = req_id
+    req_id, created = await idemp_store.aget_or_create(derived_key, make_id)
+    if not created:
+        return JSONResponse(
+            {"requestId": req_id, "enqueued": True, "deduplicated": True},
+            status_code=202
+            )
 
     job = {**data, "requestId": req_id, "_enqueuedAt": now_utc().isoformat()}
+    start_job_trace(job, traceparent)
 
     # isclient=true → direct 처리 (LLM + inflight + generator_server 호출)
     if job.get("isclient"):
-        print(f"[DIRECT] isclient=True, generator_server 직접 호출")
+        logs.info("direct_call", "isclient=True, generator_server 직접 호출", requestId=req_id)
 
         done_evt = threading.Event()
         try:
-            with lock:
-                inflight[req_id] = {
-                    "jobId": job["jobId"],
-                    "payload": job,
-                    "deadline": now_utc() + timedelta(seconds=TTL_SECONDS),
-                    "enqueuedAt": job["_enqueuedAt"],
-                    "doneEvt": done_evt,
-                }
+            register_inflight(req_id, job, done_evt)
+
+            # 클라이언트 요청은 스케줄러 단계 제한을 거치지 않고 바로 처리
+            with tracing.span("bridge.direct", parent=job_trace(job), requestId=req_id):
+                english_text = await llm_stage(job, limited=False)
 
+            gen_body = {
+                "requestId": req_id,
+                "jobId": job["jobId"],
+                "platform": job.get("platform"),
+                "img": job.get("img"),
+                "isclient": True,
+                "englishText": english_text,
+            }
+            if not GENERATOR_ENDPOINT:
+                raise RuntimeError("GENERATOR_ENDPOINT is not set")
+            t0 = time.perf_counter()
             try:
-                english_text = summarize_to_english(job)
-                job["_englishText"] = english_text
-                with lock:
-                    inflight[req_id]["englishText"] = english_text
-                log_once(req_id, f"[LLM_OK][{req_id}] {english_text}")
-            except Exception as e:
-                w = job.get("weather", {})
-                english_text = (
-                    f"{w.get('areaName','Unknown area')}: "
-                    f"{w.get('temperature','?')}°C, humidity {w.get('humidity','?')}%, "
-                    f"UV {w.get('uvIndex','?')}."
-                )
-                job["_englishText"] = english_text
-                with lock:
-                    inflight[req_id]["englishText"] = english_text
-                log_once(req_id, f"[LLM_FALLBACK][{req_id}] {english_text} | err={e}")
-
-            with httpx.Client(timeout=10) as cli:
-                gen_body = {
-                    "requestId": req_id,
-                    "jobId": job["jobId"],
-                    "platform": job.get("platform"),
-                    "img": job.get("img"),
-                    "isclient": True,
-                    "englishText": job["_englishText"],
-                }
-                if not GENERATOR_ENDPOINT:
-                    raise RuntimeError("GENERATOR_ENDPOINT is not set")
-                r = cli.post(GENERATOR_ENDPOINT, json=gen_body)
-                r.raise_for_status()
+                with tracing.span("bridge.generator_post", parent=job_trace(job), path="direct"):
+                    r = await gen_clients.next().post(GENERATOR_ENDPOINT, json=gen_body, timeout=10,
+                                              headers=tracing.inject())
+                    r.raise_for_status()
+            except Exception:
+                metrics.GEN_POST.observe(time.perf_counter() - t0, path="direct", outcome="error")
+                raise
+            metrics.GEN_POST.observe(time.perf_counter() - t0, path="direct", outcome="ok")
 
             return JSONResponse({"requestId": req_id, "enqueued": False, "direct": True}, status_code=202)
 
         except Exception as e:
-            with lock:
-                inflight.pop(req_id, None)
-            print(f"[DIRECT_FAIL][{req_id}] {e}")
+            state.pop(req_id)
+            finish_job_trace(job, "FAILED")
+            logs.error("direct_fail", str(e), requestId=req_id)
             raise HTTPException(502, f"direct call to generator failed: {e}")
 
     # isclient=false → 기존 큐 처리
     else:
         prio = 1
-        job_queue.put((prio, job))
+        scheduler.submit(prio, job)
         return JSONResponse({"requestId": req_id, "enqueued": True, "deduplicated": False}, status_code=202)
 
 #-------------veo3로 동영상 제작
 @app.post("/api/veo3-generate")
 async def enqueue_veo3_generate(
     payload: VeoBridge,
-    idem_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+    idem_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    traceparent: Optional[str] = Header(default=None),
 ):
     try:
         data = payload.model_dump()
@@ -341,39 +470,34 @@ async def enqueue_veo3_generate(
         "UUID": data.get("UUID"),
         "user": data.get("user")
     })
-    with lock:
-        if derived_key in idemp_index:
-            req_id = idemp_index[derived_key]
-            return JSONResponse(
-                {"requestId": req_id, "enqueued": True, "deduplicated": True},
-                status_code=202
-                )
-        req_id = make_id()
-        idemp_index[derived_key] = req_id
+    req_id, created = await idemp_store.aget_or_create(derived_key, make_id)
+    if not created:
+        return JSONResponse(
+            {"requestId": req_id, "enqueued": True, "deduplicated": True},
+            status_code=202
+            )
 
     job = {**data, "requestId": req_id, "_enqueuedAt": now_utc().isoformat()}
+    start_job_trace(job, traceparent)
 
     done_evt = threading.Event()
-    with lock:
-        inflight[req_id] = {
-            "jobId": job["jobId"],
-            "payload": job,
-            "deadline": now_utc() + timedelta(seconds=TTL_SECONDS),
-            "enqueuedAt": job["_enqueuedAt"],
-            "doneEvt": done_evt,
-        }
+    state.incr("veo_jobs")
+    register_inflight(req_id, job, done_evt)
     try:
-        extracted = await extract_keyword(job) or {}
+        with tracing.span("bridge.extract_keyword", parent=job_trace(job), requestId=req_id):
+            extracted = await extract_keyword(job) or {}
         job["_extracted"] = extracted
     except Exception as e:
         # 실패해도 서비스는 계속 진행: 빈 dict로 응답
-        print(f"[VEO3][{req_id}] extract_keyword failed: {e}")
+        logs.warning("veo_extract_keyword_fail", str(e), requestId=req_id)
         extracted = {}
 
     # 2) 백그라운드로 VEO 프롬프트 생성 → GENERATOR_ENDPOINT 전송
     async def _bg_task():
         try:
-            veoprompt = await veoprompt_generate(job)  # llm_client의 async 함수
+            # 위에서 뽑은 키워드를 그대로 넘김 → 잡당 extract_keyword 1회
+            with tracing.span("bridge.veoprompt", parent=job_trace(job), requestId=req_id):
+                veoprompt = await veoprompt_generate(job, extracted=extracted)
             # 제너레이터로 보낼 바디 구성 (필요 필드 포함)
             gen_body = {
                 "requestId": req_id,
@@ -387,13 +511,14 @@ async def enqueue_veo3_generate(
             if not GENERATOR_ENDPOINT:
                 raise RuntimeError("GENERATOR_ENDPOINT is not set")
 
-            # 비동기 HTTP 전송
+            # 비동기 HTTP 전송: 잡마다 클라이언트를 새로 만들지 않고 공유 풀 재사용(keep-alive)
             to = httpx.Timeout(connect=3, read=10, write=10, pool=5)
-            async with httpx.AsyncClient(timeout=to) as cli:
-                r = await cli.post(GENERATOR_ENDPOINT, json=gen_body)
+            with tracing.span("bridge.generator_post", parent=job_trace(job), path="veo"):
+                r = await gen_clients.next().post(GENERATOR_ENDPOINT, json=gen_body, timeout=to,
+                                                  headers=tracing.inject())
                 r.raise_for_status()
         except Exception as e:
-            print(f"[VEO3_BG_FAIL][{req_id}] {e}")
+            logs.error("veo_bg_fail", str(e), requestId=req_id)
         finally:
             # inflight 정리는 콜백에서 하므로 여기서는 건드리지 않음
             pass
@@ -416,11 +541,20 @@ async def generator_callback(request: Request):
     except Exception as e:
         raise HTTPException(400, f"invalid callback: {e}")
 
-    print("DEBUG callback raw:", cb)
+    # 페이로드 전체는 DEBUG에서만
+    logs.debug("callback_raw", payload=cb)
+    logs.info("callback", requestId=cb.get("requestId"), status=cb.get("status"), type=cb.get("type"))
 
-    with lock:
-        info = inflight.get(cb.get("requestId"))
-        done_evt = info.get("doneEvt") if info else None
+    # get → pop 사이에 sweeper가 끼어들지 않도록 한 번에 꺼냄
+    info = state.pop(cb.get("requestId"))
+    done_evt = info.get("doneEvt") if info else None
+
+    # 제너레이터가 보낸 traceparent 아래에 콜백 span을 붙이고, 없으면 잡 컨텍스트 아래로
+    cb_span = tracing.Span(
+        "bridge.callback",
+        tracing.parse_traceparent(request.headers.get("traceparent")) or job_trace(info and info.get("payload")),
+        attributes={"requestId": cb.get("requestId") or "", "status": cb.get("status") or "", "late": info is None},
+    )
 
     if info is None:
         event = {
@@ -434,15 +568,13 @@ async def generator_callback(request: Request):
             "message": cb.get("message") or "late callback",
             "createdAt": cb.get("createdAt") or now_utc().isoformat()
         }
-        produce_kafka(event["eventId"], event)
+        produce_kafka(event["eventId"], event, cb_span.context)
+        cb_span.end()
         return JSONResponse({"ok": True, "late": True})
 
     if done_evt:
         done_evt.set()
 
-    with lock:
-        inflight.pop(cb.get("requestId"), None)
-        
     cb_type = (cb.get("type") or "").lower().strip()
     if cb_type in ("video", "image"):
         event_type = cb_type
@@ -466,31 +598,86 @@ async def generator_callback(request: Request):
         "createdAt": cb.get("createdAt") or now_utc().isoformat()
     }
 
-    produce_kafka(event["eventId"], event)
+    produce_kafka(event["eventId"], event, cb_span.context)
 
-    with lock:
-        completed.add(cb.get("requestId"))
+    state.incr("completed")
+    cb_span.end()
+    finish_job_trace(info.get("payload"), event["status"])
+    try:
+        enqueued_at = datetime.fromisoformat(info["enqueuedAt"])
+        metrics.TIME_TO_CALLBACK.observe((now_utc() - enqueued_at).total_seconds(),
+                                         type=metrics.bounded(event_type, metrics.CALLBACK_TYPES),
+                                         status=metrics.bounded(event["status"], metrics.CALLBACK_STATUSES))
+    except (KeyError, TypeError, ValueError):
+        pass
 
     return JSONResponse({"ok": True, "late": False})
 
 #queue 상태 --------------------------------
 @app.get("/queue/stats")
 def stats():
-    with lock:
-        return {
-            "queued": job_queue.qsize(),
-            "inflight": len(inflight),
-            "completed": len(completed)
-        }
+    calls = llm_call_stats()
+    sched = scheduler.stats()
+    veo_jobs = state.counter("veo_jobs")
+    return {
+        "queued": sched["queued"],
+        "running": sched["running"],
+        "retrying": sched["retrying"],
+        "stages": sched["stages"],
+        "inflight": len(state),
+        "completed": state.counter("completed"),
+        "llmCalls": calls,
+        "keywordCallsPerVeoJob": round(calls["keyword"] / veo_jobs, 3) if veo_jobs else None,
+        "llmCache": llm_cache_stats(),
+        "idempotency": idemp_store.stats(),
+        "comments": {"batch": comment_batcher.stats() if COMMENTS_BATCH else None,
+                     "usage": comment_usage_stats()},
+        "logging": logs.stats(),
+    }
+
+@app.delete("/queue/{req_id}")
+async def cancel_job(req_id: str):
+    job = scheduler.cancel(req_id)
+    if job is None:
+        raise HTTPException(404, "job is not queued or running")
+    info = state.pop(req_id)
+    finish_job_trace(job, "CANCELLED")
+    event = {
+        "eventId": f"evt_{req_id}_cancelled",
+        "requestId": req_id,
+        "jobId": job["jobId"],
+        "prompt": (info or {}).get("englishText"),
+        "status": "FAILED",
+        "message": "cancelled",
+        "createdAt": now_utc().isoformat()
+    }
+    produce_kafka(event["eventId"], event)
+    return {"requestId": req_id, "cancelled": True}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 #상태 -------------------------------------
 @app.get("/healthz")
 def health():
     return {"ok": True}
 
 #댓글분석 api ----------------------------------
+# 창(COMMENTS_BATCH_WINDOW_MS) 동안 모인 봉투를 한 번의 Gemini 호출로 분석,
+# 배치 응답에서 빠지거나 검증에 실패한 봉투만 단건 호출로 다시 처리
+comment_batcher = MicroBatcher(
+    summarize_top3_batch_async, summarize_top3_text_async,
+    window_s=COMMENTS_BATCH_WINDOW_MS / 1000.0, max_items=COMMENTS_BATCH_MAX,
+    max_chars=COMMENTS_BATCH_MAX_CHARS, size_of=lambda env: len(json.dumps(env, ensure_ascii=False)),
+)
+
 @app.post("/api/comments")
-def comments_top3(envelope: Dict[str, Any]):
+async def comments_top3(envelope: Dict[str, Any]):
     if not envelope:
         raise HTTPException(400, "데이터는 Dictionary 형태여야 합니다.")
-    data = summarize_top3_text(envelope)
+    if COMMENTS_BATCH:
+        data = await comment_batcher.submit(envelope)
+    else:
+        data = await summarize_top3_text_async(envelope)
     return JSONResponse(content=data, status_code=200)
\ No newline at end of file
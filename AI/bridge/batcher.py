@@ -0,0 +1,108 @@
+# batcher.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bridge import logs
+
+BatchFn = Callable[[List[Any]], Awaitable[List[Optional[Any]]]]
+SingleFn = Callable[[Any], Awaitable[Any]]
+
+
+class MicroBatcher:
+    """짧은 창(window_s) 동안 들어온 요청을 모아 한 번에 처리한다.
+
+    - 창의 첫 요청이 타이머를 켜고, max_items / max_chars에 닿으면 기다리지 않고 보냄
+    - run_batch는 입력 순서대로 결과를 돌려주고, 빠졌거나 검증에 실패한 자리는 None
+    - None 자리는(배치 호출 자체가 실패하면 전부) run_single로 하나씩 다시 처리
+    - 한 건만 모였으면 배치 프롬프트 없이 바로 run_single
+    """
+
+    def __init__(self, run_batch: BatchFn, run_single: SingleFn, window_s: float, max_items: int,
+                 max_chars: int = 0, size_of: Optional[Callable[[Any], int]] = None):
+        self._run_batch = run_batch
+        self._run_single = run_single
+        self._window_s = window_s
+        self._max_items = max(1, max_items)
+        self._max_chars = max_chars
+        self._size_of = size_of
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._pending_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._counts = {"submitted": 0, "completed": 0, "batches": 0, "batchedItems": 0,
+                        "singles": 0, "fallbacks": 0, "batchErrors": 0}
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        size = self._size_of(item) if self._size_of else 0
+        # 프롬프트가 너무 커지지 않도록 글자 수 상한을 넘기면 지금까지 모은 것부터 보냄
+        if self._pending and self._max_chars and self._pending_chars + size > self._max_chars:
+            self._flush()
+        self._pending.append((item, fut))
+        self._pending_chars += size
+        self._counts["submitted"] += 1
+        if len(self._pending) >= self._max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window_s, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_chars = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        results: List[Optional[Any]] = [None] * len(batch)
+        if len(batch) > 1:
+            self._counts["batches"] += 1
+            try:
+                out = list(await self._run_batch([item for item, _ in batch]))
+                if len(out) != len(batch):
+                    raise RuntimeError(f"batch returned {len(out)} results for {len(batch)} items")
+                results = out
+            except Exception as e:
+                self._counts["batchErrors"] += 1
+                logs.warning("batch_fail", str(e), items=len(batch))
+            ok = sum(r is not None for r in results)
+            self._counts["batchedItems"] += ok
+            self._counts["fallbacks"] += len(batch) - ok
+
+        async def settle(i: int) -> None:
+            item, fut = batch[i]
+            try:
+                res = results[i]
+                if res is None:
+                    self._counts["singles"] += 1
+                    res = await self._run_single(item)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                if not fut.done():   # 호출자가 먼저 끊었으면 결과는 버림
+                    fut.set_result(res)
+            finally:
+                self._counts["completed"] += 1
+
+        await asyncio.gather(*(settle(i) for i in range(len(batch))))
+
+    async def close(self) -> None:
+        # 종료 시: 모아 둔 요청을 마저 보내고 진행 중인 배치를 기다림
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        c = dict(self._counts)
+        # 봉투마다 한 번씩 호출했을 때 대비 줄어든 LLM 호출 수 (폴백이 많으면 음수도 가능)
+        c["llmCalls"] = c["batches"] + c["singles"]
+        c["callsSaved"] = c["completed"] - c["llmCalls"]
+        c["avgBatchSize"] = round((c["batchedItems"] + c["fallbacks"]) / c["batches"], 2) if c["batches"] else None
+        c["pending"] = len(self._pending)
+        return c
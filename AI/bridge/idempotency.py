@@ -0,0 +1,131 @@
+# idempotency.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+IDEMP_BACKEND = os.getenv("IDEMP_BACKEND", "memory")   # memory | sqlite
+IDEMP_TTL_S   = float(os.getenv("IDEMP_TTL_S", "86400"))
+IDEMP_MAX     = int(os.getenv("IDEMP_MAX", "100000"))
+IDEMP_DB_PATH = os.getenv("IDEMP_DB_PATH", "./idempotency.sqlite3")
+
+
+class MemoryIdempotencyStore:
+    """Idempotency-Key → requestId. TTL이 지나거나 max_entries를 넘으면 오래된 것부터 제거.
+
+    TTL이 고정이라 삽입 순서 = 만료 순서 → 앞에서부터 잘라내면 된다.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.evictions = 0
+
+    def get_or_create(self, key: str, make_id: Callable[[], str]) -> Tuple[str, bool]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            item = self._data.get(key)
+            if item is not None:
+                self.hits += 1
+                return item[1], False
+            req_id = make_id()
+            self._data[key] = (now + self.ttl_s, req_id)
+            self._evict(now)
+            return req_id, True
+
+    async def aget_or_create(self, key: str, make_id: Callable[[], str]) -> Tuple[str, bool]:
+        # 메모리 조회라 루프에서 바로 처리
+        return self.get_or_create(key, make_id)
+
+    def _evict(self, now: float) -> None:
+        while self._data:
+            k, (expires, _) = next(iter(self._data.items()))
+            if expires >= now and len(self._data) <= self.max_entries:
+                break
+            del self._data[k]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "size": len(self._data),
+                    "hits": self.hits, "evictions": self.evictions}
+
+
+class SQLiteIdempotencyStore:
+    """재시작 후에도 유지되고, 한 호스트의 여러 uvicorn 워커가 같은 파일을 공유할 수 있는 저장소.
+
+    BEGIN IMMEDIATE로 조회+삽입을 한 트랜잭션에 묶어 프로세스 간에도 같은 키에 하나의 requestId만 발급.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " k TEXT PRIMARY KEY, req_id TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idempotency_expires ON idempotency(expires)")
+        self._inserts = 0
+        self.hits = self.evictions = 0
+
+    def get_or_create(self, key: str, make_id: Callable[[], str]) -> Tuple[str, bool]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT req_id FROM idempotency WHERE k=? AND expires>=?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("COMMIT")
+                    self.hits += 1
+                    return row[0], False
+                req_id = make_id()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO idempotency(k, req_id, expires) VALUES (?,?,?)",
+                    (key, req_id, now + self.ttl_s),
+                )
+                self._inserts += 1
+                if self._inserts % self.PURGE_EVERY == 0:
+                    self._purge(now)
+                self._db.execute("COMMIT")
+                return req_id, True
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    async def aget_or_create(self, key: str, make_id: Callable[[], str]) -> Tuple[str, bool]:
+        # 다른 워커가 쓰기 락을 잡고 있으면 BEGIN IMMEDIATE가 최대 timeout(5s)까지 기다리므로 스레드에서
+        return await asyncio.to_thread(self.get_or_create, key, make_id)
+
+    def _purge(self, now: float) -> None:
+        cur = self._db.execute("DELETE FROM idempotency WHERE expires < ?", (now,))
+        self.evictions += max(cur.rowcount, 0)
+        cur = self._db.execute(
+            "DELETE FROM idempotency WHERE k IN ("
+            " SELECT k FROM idempotency ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evictions += max(cur.rowcount, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+        return {"backend": "sqlite", "size": size, "hits": self.hits, "evictions": self.evictions}
+
+
+def make_idempotency_store():
+    if IDEMP_BACKEND == "sqlite":
+        return SQLiteIdempotencyStore(IDEMP_DB_PATH, IDEMP_MAX, IDEMP_TTL_S)
+    return MemoryIdempotencyStore(IDEMP_MAX, IDEMP_TTL_S)
@@ -3,13 +3,18 @@ import asyncio
 import base64
 import mimetypes
 import re
-import os, json, time
-from typing import Any, Dict, Optional
+import itertools
+import os, json, time, threading, hashlib, sqlite3
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
 import httpx
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+from bridge import logs
+
 load_dotenv()
 
 SYSTEM = ('''
@@ -118,6 +123,16 @@ ANALYSIS = ("""
 - JSON 이외의 텍스트/코드블록/주석/접두·접미 문구를 절대 포함하지 마세요.
 """).strip()
 
+# /api/comments 마이크로배치: 여러 봉투를 한 프롬프트로
+ANALYSIS_BATCH = (ANALYSIS + """
+
+[여러 문서 모드]
+- 입력은 {"documents": [{"id": "string", "input": <위 입력 스키마>}, ...]} 형태입니다.
+- 각 문서의 input은 서로 독립적입니다. 다른 문서의 댓글을 섞지 말고 문서마다 위 규칙대로 분석하세요.
+- 출력은 아래 JSON 하나만 반환합니다. results에는 모든 문서를 같은 id로 포함합니다.
+{"results": [{"id": "string", "result": <위 출력 JSON 중 하나>}, ...]}
+""").strip()
+
 KEYWORD = ("""
 당신은 사용자의 의도를 파악하는 전문가입니다. 
 사용자의 의도를 파악하기 위해 아래의 내용을 익히세요
@@ -217,6 +232,276 @@ def _get_api_key() -> str:
 def _model_name() -> str:
     return os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 
+def _endpoint(model: str, api_key: str) -> str:
+    base = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+    return f"{base}/v1beta/models/{model}:generateContent?key={api_key}"
+
+# -------------------
+# HTTP client pool
+# -------------------
+# 호출마다 httpx.Client를 새로 만들면 DNS/TCP/TLS 핸드셰이크를 매번 다시 하므로
+# 프로세스 단위로 sync/async 클라이언트를 공유한다. (app.py lifespan에서 open/close)
+HTTP_POOL_ENABLED = os.getenv("LLM_HTTP_POOL", "1") != "0"
+HTTP_POOL_SIZE    = int(os.getenv("LLM_HTTP_POOL_SIZE", "50"))
+HTTP_KEEPALIVE_S  = float(os.getenv("LLM_HTTP_KEEPALIVE_S", "60"))
+HTTP_POOL_PER_SHARD = int(os.getenv("LLM_HTTP_POOL_PER_SHARD", "16"))   # AsyncClient 하나가 맡는 연결 수
+
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional["AsyncClientShards"] = None
+_pool_lock = threading.Lock()
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+def _pool_kwargs(size: int = HTTP_POOL_SIZE) -> Dict[str, Any]:
+    return {
+        "http2": _http2_available(),
+        "limits": httpx.Limits(
+            max_connections=size,
+            max_keepalive_connections=size,
+            keepalive_expiry=HTTP_KEEPALIVE_S,
+        ),
+    }
+
+class AsyncClientShards:
+    """연결 size개를 AsyncClient 여러 개(각 per_shard개)에 나눠 두고 라운드로빈으로 빌려준다.
+
+    httpcore 연결 풀은 요청/응답 이벤트마다 (대기 요청 × 연결)을 훑는다. 한 풀에 연결이 100개쯤 되면
+    이 스캔이 루프 CPU를 다 먹어서(300 req / 100 conn에 CPU 10s) 스레드 모델보다 느려진다.
+    작은 풀 여러 개로 나누면 스캔 비용이 샤드 수만큼 줄어든다.
+    """
+
+    def __init__(self, size: int, per_shard: int = HTTP_POOL_PER_SHARD, **kwargs: Any):
+        n = max(1, -(-size // max(1, per_shard)))
+        self._clients = [httpx.AsyncClient(**_pool_kwargs(-(-size // n)), **kwargs) for _ in range(n)]
+        self._rr = itertools.count()
+
+    def next(self) -> httpx.AsyncClient:
+        return self._clients[next(self._rr) % len(self._clients)]
+
+    @property
+    def is_closed(self) -> bool:
+        return any(c.is_closed for c in self._clients)
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(c.aclose() for c in self._clients))
+
+def get_sync_client() -> httpx.Client:
+    global _sync_client
+    with _pool_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_pool_kwargs())
+        return _sync_client
+
+def get_async_client() -> httpx.AsyncClient:
+    # AsyncClient는 생성된 이벤트 루프에 묶이므로 lifespan(앱 루프)에서 먼저 만들어 둔다
+    global _async_client
+    with _pool_lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = AsyncClientShards(HTTP_POOL_SIZE)
+        return _async_client.next()
+
+def open_http_pool() -> None:
+    if not HTTP_POOL_ENABLED:
+        return
+    get_sync_client()
+    get_async_client()
+
+async def close_http_pool() -> None:
+    global _sync_client, _async_client
+    with _pool_lock:
+        sync_cli, async_cli = _sync_client, _async_client
+        _sync_client, _async_client = None, None
+    if sync_cli is not None:
+        sync_cli.close()
+    if async_cli is not None:
+        await async_cli.aclose()
+
+@contextmanager
+def _sync_session() -> Iterator[httpx.Client]:
+    if HTTP_POOL_ENABLED:
+        yield get_sync_client()
+    else:
+        with httpx.Client() as cli:
+            yield cli
+
+@asynccontextmanager
+async def _async_session() -> AsyncIterator[httpx.AsyncClient]:
+    if HTTP_POOL_ENABLED:
+        yield get_async_client()
+    else:
+        async with httpx.AsyncClient() as cli:
+            yield cli
+
+# -------------------
+# Call counters
+# -------------------
+llm_calls: Dict[str, int] = {"summarize": 0, "comments": 0, "keyword": 0, "veoprompt": 0}
+_calls_lock = threading.Lock()
+
+def _count_call(kind: str) -> None:
+    with _calls_lock:
+        llm_calls[kind] = llm_calls.get(kind, 0) + 1
+
+def llm_call_stats() -> Dict[str, int]:
+    with _calls_lock:
+        return dict(llm_calls)
+
+# -------------------
+# Response cache
+# -------------------
+# 같은 지역/같은 시간대의 Weather 페이로드는 프롬프트가 동일하므로
+# model + system + user prompt 해시로 결과 텍스트를 재사용한다.
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")   # memory | sqlite | off
+LLM_CACHE_TTL_S   = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_MAX     = int(os.getenv("LLM_CACHE_MAX", "1024"))
+LLM_CACHE_PATH    = os.getenv("LLM_CACHE_PATH", "./llm_cache.sqlite3")
+
+def _cache_key(model: str, system: str, user_prompt: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, system, user_prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class MemoryLRUCache:
+    """프로세스 내 LRU + TTL 캐시."""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires < time.time():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    # 메모리 조회라 루프에서 바로 처리
+    async def aget(self, key: str) -> Optional[str]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "size": len(self._data), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+class SQLiteCache:
+    """재시작 후에도 유지되는 디스크 캐시. 만료/용량 초과 시 가장 오래 안 쓴 항목부터 삭제."""
+
+    def __init__(self, path: str, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " k TEXT PRIMARY KEY, v TEXT NOT NULL, expires REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache(used)")
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT v, expires FROM llm_cache WHERE k=?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now:
+                self._db.execute("DELETE FROM llm_cache WHERE k=?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_cache SET used=? WHERE k=?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache(k, v, expires, used) VALUES (?,?,?,?)",
+                (key, value, now + self.ttl_s, now),
+            )
+            cur = self._db.execute("DELETE FROM llm_cache WHERE expires < ?", (now,))
+            self.evictions += max(cur.rowcount, 0)
+            cur = self._db.execute(
+                "DELETE FROM llm_cache WHERE k IN ("
+                " SELECT k FROM llm_cache ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    # 비동기 경로(summarize_to_english_async)용: SELECT/UPDATE/DELETE가 루프를 막지 않도록 스레드에서
+    async def aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"backend": "sqlite", "size": size, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+def _make_cache():
+    if LLM_CACHE_BACKEND == "sqlite":
+        return SQLiteCache(LLM_CACHE_PATH, LLM_CACHE_MAX, LLM_CACHE_TTL_S)
+    if LLM_CACHE_BACKEND == "memory":
+        return MemoryLRUCache(LLM_CACHE_MAX, LLM_CACHE_TTL_S)
+    return None
+
+llm_cache = _make_cache()
+
+def llm_cache_stats() -> Dict[str, Any]:
+    if llm_cache is None:
+        return {"backend": "off"}
+    return llm_cache.stats()
+
+_genai_clients: Dict[str, "genai.Client"] = {}
+
+def _genai_client(api_key: str) -> "genai.Client":
+    # genai.Client도 내부 HTTP 세션을 가지므로 키별로 재사용
+    with _pool_lock:
+        cli = _genai_clients.get(api_key)
+        if cli is None:
+            # GEMINI_BASE_URL을 주면 SDK 호출도 같은 곳으로 (로컬 대역/프록시)
+            base = os.getenv("GEMINI_BASE_URL")
+            http_options = types.HttpOptions(base_url=base.rstrip("/") + "/") if base else None
+            cli = _genai_clients[api_key] = genai.Client(api_key=api_key, http_options=http_options)
+        return cli
+
 #프롬프트 생성 함수
 def _build_user_prompt(payload: Dict[str, Any]) -> str:
     w = payload.get("weather") or {}
@@ -260,66 +545,126 @@ def _enforce_word_blocks(text: str) -> str:
     return " — ".join(norm_blocks)
 
 
-def summarize_to_english(payload: Dict[str, Any]) -> str:
+def _summary_request(payload: Dict[str, Any]) -> tuple[str, str, Dict[str, Any]]:
     api_key = _get_api_key()
     model   = _model_name()
-    endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+    endpoint = _endpoint(model, api_key)
+    user_prompt = _build_user_prompt(payload)
 
     req = {
     "systemInstruction": {"role": "system", "parts": [{"text": SYSTEM}]},
     "contents": [
-        {"role": "user", "parts": [{"text": _build_user_prompt(payload)}]}
+        {"role": "user", "parts": [{"text": user_prompt}]}
     ]
     }
+    return _cache_key(model, SYSTEM, user_prompt), endpoint, req
+
+def _summary_text(data: Dict[str, Any]) -> str:
+    parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts") or []
+    text  = " ".join(p.get("text","").strip() for p in parts if p.get("text"))
+    text  = " ".join(text.split()).strip()
+    text = _enforce_word_blocks(text)
+    if not text:
+        raise RuntimeError("Empty or unparsable WB output")
+    return text
+
+def summarize_to_english(payload: Dict[str, Any]) -> str:
+    cache_key, endpoint, req = _summary_request(payload)
+    if llm_cache is not None:
+        cached = llm_cache.get(cache_key)
+        if cached:
+            return cached
+    _count_call("summarize")
 
-    last_err: Optional[Exception] = None
     for i in range(3):
         try:
-            with httpx.Client(timeout=20) as cli:
-                resp = cli.post(endpoint, json=req)
+            with _sync_session() as cli:
+                resp = cli.post(endpoint, json=req, timeout=20)
             resp.raise_for_status()
-            data = resp.json()
-            parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts") or []
-            text  = " ".join(p.get("text","").strip() for p in parts if p.get("text"))
-            text  = " ".join(text.split()).strip()
-            text = _enforce_word_blocks(text)
-            if not text:
-                raise RuntimeError("Empty or unparsable WB output")
+            text = _summary_text(resp.json())
+            if llm_cache is not None:
+                llm_cache.set(cache_key, text)
             return text
-            # if not text:
-            #     raise RuntimeError("Empty response from Gemini REST")
-            # return text
         except Exception as e:
-            last_err = e
             if i < 2:
+                logs.warning("llm_retry", str(e), call="summarize", attempt=i + 1)
                 time.sleep(0.6*(i+1))
             else:
                 raise RuntimeError(f"Gemini REST failed: {e}") from e
 
+async def summarize_to_english_async(payload: Dict[str, Any]) -> str:
+    # 스케줄러(app.py)용: 스레드를 점유하지 않는 summarize_to_english
+    cache_key, endpoint, req = _summary_request(payload)
+    if llm_cache is not None:
+        cached = await llm_cache.aget(cache_key)
+        if cached:
+            return cached
+    _count_call("summarize")
+
+    for i in range(3):
+        try:
+            async with _async_session() as cli:
+                resp = await cli.post(endpoint, json=req, timeout=20)
+            resp.raise_for_status()
+            text = _summary_text(resp.json())
+            if llm_cache is not None:
+                await llm_cache.aset(cache_key, text)
+            return text
+        except Exception as e:
+            if i < 2:
+                logs.warning("llm_retry", str(e), call="summarize", attempt=i + 1)
+                await asyncio.sleep(0.6*(i+1))
+            else:
+                raise RuntimeError(f"Gemini REST failed: {e}") from e
+
 #댓글에 관한 gemini api call (통합 고려)    
-def _call_gemini(promptA: str, promptB: str) -> str:
-    api_key = _get_api_key()
-    model   = _model_name()
-    endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-    req = {"contents": [{"role":"user","parts":[{"text":promptA}]},
-                        {"role":"user","parts":[{"text":promptB}]}]}
-    last_err: Optional[Exception] = None
+def _comments_request(promptA: str, promptB: str) -> Dict[str, Any]:
+    return {"contents": [{"role":"user","parts":[{"text":promptA}]},
+                         {"role":"user","parts":[{"text":promptB}]}]}
+
+def _comments_text(data: Dict[str, Any]) -> str:
+    parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts") or []
+    text  = " ".join(p.get("text","").strip() for p in parts if p.get("text"))
+    return " ".join(text.split()).strip()
+
+def _call_gemini(promptA: str, promptB: str) -> Tuple[str, Dict[str, Any]]:
+    # (응답 텍스트, usageMetadata)
+    _count_call("comments")
+    endpoint = _endpoint(_model_name(), _get_api_key())
+    req = _comments_request(promptA, promptB)
     for i in range(3):
         try:
-            with httpx.Client(timeout=30) as cli:
-                resp = cli.post(endpoint, json=req)
+            with _sync_session() as cli:
+                resp = cli.post(endpoint, json=req, timeout=30)
             resp.raise_for_status()
             data = resp.json()
-            parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts") or []
-            text  = " ".join(p.get("text","").strip() for p in parts if p.get("text"))
-            return " ".join(text.split()).strip()
+            return _comments_text(data), data.get("usageMetadata") or {}
         except Exception as e:
-            last_err = e
             if i < 2:
+                logs.warning("llm_retry", str(e), call="comments", attempt=i + 1)
                 time.sleep(0.5 * (i+1))
             else:
                 raise RuntimeError(f"Gemini REST failed: {e}") from e
 
+async def _call_gemini_async(promptA: str, promptB: str) -> Tuple[str, Dict[str, Any]]:
+    # /api/comments(app.py)용: 스레드풀 슬롯을 잡지 않는 _call_gemini
+    _count_call("comments")
+    endpoint = _endpoint(_model_name(), _get_api_key())
+    req = _comments_request(promptA, promptB)
+    for i in range(3):
+        try:
+            async with _async_session() as cli:
+                resp = await cli.post(endpoint, json=req, timeout=30)
+            resp.raise_for_status()
+            data = resp.json()
+            return _comments_text(data), data.get("usageMetadata") or {}
+        except Exception as e:
+            if i < 2:
+                logs.warning("llm_retry", str(e), call="comments", attempt=i + 1)
+                await asyncio.sleep(0.5 * (i+1))
+            else:
+                raise RuntimeError(f"Gemini REST failed: {e}") from e
+
 def _normalize_to_new_schema(envelope: Dict[str, Any]) -> Dict[str, Any]:
     env = dict(envelope) if envelope else {}
     yt = (env.get("youtube") or {})
@@ -339,27 +684,18 @@ def _normalize_to_new_schema(envelope: Dict[str, Any]) -> Dict[str, Any]:
 def _force_str(x):
     return "" if x is None else str(x)
 
-
-#상위 3개 댓글 분석 
-def summarize_top3_text(envelope: dict) -> dict:
-    # 0) 입력 보정(레거시→신규, comment-level video_id 제거)
-    envelope = _normalize_to_new_schema(envelope)
-
-    # 1) 모델 호출
-    user_prompt = json.dumps(envelope, ensure_ascii=False)
-    raw = _call_gemini(ANALYSIS, user_prompt)
-
-    # 2) JSON 추출 시도
+def _extract_json(raw: str) -> Optional[Any]:
     raw = (raw or "").strip().strip("`").strip()
     start, end = raw.find("{"), raw.rfind("}")
-    data = None
     if start != -1 and end != -1 and end > start:
         try:
-            data = json.loads(raw[start:end+1])
+            return json.loads(raw[start:end+1])
         except Exception:
-            data = None
+            return None
+    return None
 
-    # 3) 정상 응답이면 키 보정 + 숫자 문자열화 + video_id 보강
+def _fix_top3(data: Any) -> Optional[dict]:
+    # 정상 응답이면 키 보정 + 숫자 문자열화
     if data and isinstance(data, dict):
         top_key = "top comments" if "top comments" in data else ("top_comments" if "top_comments" in data else None)
         if top_key and isinstance(data.get(top_key), list):
@@ -375,11 +711,90 @@ def summarize_top3_text(envelope: dict) -> dict:
                 data["top comments"] = data.pop("top_comments")
 
         return data
+    return None
+
+# -------------------
+# Comment token usage
+# -------------------
+# single: 봉투 하나당 호출 하나 / batch: 여러 봉투를 한 프롬프트로 (ANALYSIS 지시문을 한 번만 보냄)
+comment_usage: Dict[str, Dict[str, int]] = {
+    mode: {"calls": 0, "envelopes": 0, "promptTokens": 0, "outputTokens": 0} for mode in ("single", "batch")
+}
+
+def _record_comment_usage(mode: str, envelopes: int, usage: Dict[str, Any]) -> None:
+    with _calls_lock:
+        u = comment_usage[mode]
+        u["calls"] += 1
+        u["envelopes"] += envelopes
+        u["promptTokens"] += int(usage.get("promptTokenCount") or 0)
+        u["outputTokens"] += int(usage.get("candidatesTokenCount") or 0)
+
+def comment_usage_stats() -> Dict[str, Any]:
+    with _calls_lock:
+        out = {mode: dict(u) for mode, u in comment_usage.items()}
+    for u in out.values():
+        total = u["promptTokens"] + u["outputTokens"]
+        u["tokensPerEnvelope"] = round(total / u["envelopes"], 1) if u["envelopes"] else None
+    return out
+
+#상위 3개 댓글 분석 
+def summarize_top3_text(envelope: dict) -> dict:
+    # 0) 입력 보정(레거시→신규, comment-level video_id 제거)
+    envelope = _normalize_to_new_schema(envelope)
+
+    # 1) 모델 호출
+    user_prompt = json.dumps(envelope, ensure_ascii=False)
+    raw, usage = _call_gemini(ANALYSIS, user_prompt)
+    _record_comment_usage("single", 1, usage)
+
+    # 2) JSON 추출 + 3) 키 보정
+    return _fix_top3(_extract_json(raw))
+
+async def summarize_top3_text_async(envelope: dict) -> Optional[dict]:
+    envelope = _normalize_to_new_schema(envelope)
+    raw, usage = await _call_gemini_async(ANALYSIS, json.dumps(envelope, ensure_ascii=False))
+    _record_comment_usage("single", 1, usage)
+    return _fix_top3(_extract_json(raw))
+
+def _top3_matches(envelope: Dict[str, Any], data: Any) -> bool:
+    # 배치 응답 검증: 형식 + 다른 문서와 섞이지 않았는지(videoId/postId 대조)
+    if not isinstance(data, dict) or not isinstance(data.get("atmosphere"), str):
+        return False
+    top = data.get("top comments", data.get("top_comments"))
+    if not isinstance(top, list) or not all(isinstance(it, dict) for it in top):
+        return False
+    video_id = (envelope.get("youtube") or {}).get("videoId")
+    if video_id and data.get("video_id") not in (None, "", video_id):
+        return False
+    post_id = (envelope.get("reddit") or {}).get("postId")
+    if post_id and data.get("postId") not in (None, "", post_id):
+        return False
+    return True
+
+async def summarize_top3_batch_async(envelopes: list[dict]) -> list[Optional[dict]]:
+    """여러 봉투를 한 번의 호출로 분석. 입력 순서대로 결과를 돌려주고,
+    빠졌거나 검증에 실패한 자리는 None (호출자가 단건으로 다시 처리)."""
+    envelopes = [_normalize_to_new_schema(e) for e in envelopes]
+    docs = {"documents": [{"id": str(i), "input": e} for i, e in enumerate(envelopes)]}
+    raw, usage = await _call_gemini_async(ANALYSIS_BATCH, json.dumps(docs, ensure_ascii=False))
+    _record_comment_usage("batch", len(envelopes), usage)
+
+    data = _extract_json(raw)
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        raise RuntimeError("batch response has no results list")
+    by_id = {str(r.get("id")): r.get("result") for r in results if isinstance(r, dict)}
+    out: list[Optional[dict]] = []
+    for i, env in enumerate(envelopes):
+        res = by_id.get(str(i))
+        out.append(_fix_top3(res) if _top3_matches(env, res) else None)
+    return out
 
 async def extract_keyword(input: Dict[str, Any]) -> dict:
+    _count_call("keyword")
     api_key = _get_api_key()
     model   = _model_name()
-    endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+    endpoint = _endpoint(model, api_key)
 
 
     inp = dict(input) if input else {}
@@ -398,11 +813,12 @@ async def extract_keyword(input: Dict[str, Any]) -> dict:
         ]
     }
 
-    last_err: Optional[Exception] = None
+    # 이벤트 루프를 막지 않도록 AsyncClient + asyncio.sleep 백오프 사용
+    text = ""
     for i in range(3):
         try:
-            with httpx.Client(timeout=20) as cli:
-                resp = cli.post(endpoint, json=req)
+            async with _async_session() as cli:
+                resp = await cli.post(endpoint, json=req, timeout=20)
             resp.raise_for_status()
             data = resp.json()
             parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts") or []
@@ -410,10 +826,11 @@ async def extract_keyword(input: Dict[str, Any]) -> dict:
             text  = " ".join(text.split()).strip()
             if not text:
                 raise RuntimeError("Empty response from Gemini REST")
+            break
         except Exception as e:
-            last_err = e
             if i < 2:
-                time.sleep(0.6*(i+1))
+                logs.warning("llm_retry", str(e), call="keyword", attempt=i + 1)
+                await asyncio.sleep(0.6*(i+1))
             else:
                 raise RuntimeError(f"Gemini REST failed: {e}") from e
 
@@ -431,12 +848,14 @@ async def extract_keyword(input: Dict[str, Any]) -> dict:
     if data and isinstance(data, dict):
         return data
 
-async def veoprompt_generate(payload: Dict[str, Any]) -> str:
+async def veoprompt_generate(payload: Dict[str, Any], extracted: Optional[dict] = None) -> str:
+    # extracted: 호출 측에서 이미 extract_keyword를 돌렸으면 그 결과를 넘겨 중복 호출을 피함
+    _count_call("veoprompt")
     api_key = _get_api_key()
     model = _model_name() or "gemini-2.5-flash"
-    client = genai.Client(api_key=api_key)
+    client = _genai_client(api_key)
 
-    extract = await extract_keyword(payload)
+    extract = extracted if extracted is not None else await extract_keyword(payload)
     if extract is None:
         extract = {}
 
@@ -539,19 +958,16 @@ async def veoprompt_generate(payload: Dict[str, Any]) -> str:
                 return None, None
         return None, None
 
-    image_bytes, image_mime = _resolve_image_bytes(Di.get("img"))
+    # 로컬 파일 읽기/base64 디코드가 루프를 막지 않도록 스레드로
+    image_bytes, image_mime = await asyncio.to_thread(_resolve_image_bytes, Di.get("img"))
 
     contents: list[Any] = [gemini_prompt]
     if image_bytes:
         contents.append(types.Part.from_bytes(data=image_bytes, mime_type=image_mime or "image/png"))
 
     async def _call_model() -> str:
-        loop = asyncio.get_running_loop()
-
-        def _do_call():
-            return client.models.generate_content(model=model, contents=contents)
-
-        response = await loop.run_in_executor(None, _do_call)
+        # client.aio: 스레드풀을 거치지 않는 네이티브 async 호출
+        response = await client.aio.models.generate_content(model=model, contents=contents)
         text = getattr(response, "text", "") or ""
         text = text.strip()
         if not text and getattr(response, "candidates", None):
@@ -574,6 +990,7 @@ async def veoprompt_generate(payload: Dict[str, Any]) -> str:
             return await _call_model()
         except Exception as e:
             if attempt < 2:
+                logs.warning("llm_retry", str(e), call="veoprompt", attempt=attempt + 1)
                 await asyncio.sleep(0.6 * (attempt + 1))
                 continue
             raise RuntimeError(f"Gemini client failed: {e}") from e
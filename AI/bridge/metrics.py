@@ -0,0 +1,154 @@
+# metrics.py
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+# 초 단위 기본 버킷: 수 ms(Kafka ack) ~ 수십 분(영상 생성 후 콜백)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(v: str) -> str:
+    # Prometheus 텍스트 포맷: 라벨 값 안의 \\, ", 줄바꿈은 이스케이프
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple[str, ...], float] = {}
+
+    def inc(self, n: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """값을 들고 있지 않고, 스크레이프할 때 fn()을 불러 읽는다 (큐 길이 등)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float]):
+        super().__init__(name, help)
+        self._fn = fn
+
+    def _samples(self) -> list[str]:
+        try:
+            return [f"{self.name} {_fmt_value(self._fn())}"]
+        except Exception:
+            return []
+
+
+class Histogram(_Metric):
+    """Prometheus 누적 버킷 히스토그램. observe는 bisect 한 번 + 락 구간의 덧셈뿐."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 → [버킷별 개수(비누적) ..., +Inf 개수], 합계
+        self._counts: Dict[tuple[str, ...], list[int]] = {}
+        self._sums: Dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[i] += 1
+            self._sums[key] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(c), self._sums[k]) for k, c in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            acc = 0
+            for le, c in zip((*self.buckets, float("inf")), counts):
+                acc += c
+                le_label = 'le="%s"' % _fmt_value(le)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le_label)} {acc}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {acc}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_prometheus(registry: Optional[list[_Metric]] = None) -> str:
+    lines: list[str] = []
+    for m in registry if registry is not None else REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------
+# 브리지 파이프라인 지표
+# -------------------
+# 콜백 본문에서 온 값은 정해진 목록으로만 라벨에 넣는다 (나머지는 other → 시계열 수 고정)
+CALLBACK_TYPES = frozenset({"video", "image"})
+CALLBACK_STATUSES = frozenset({"SUCCESS", "FAILED"})
+
+
+def bounded(value: Optional[str], allowed: frozenset, other: str = "other") -> str:
+    return value if value in allowed else other
+
+
+QUEUE_WAIT = Histogram("bridge_queue_wait_seconds",
+                       "Time from enqueue (_enqueuedAt) to first dequeue by a worker")
+LLM_LATENCY = Histogram("bridge_llm_summarize_seconds",
+                        "LLM summarize latency per job", ("path", "outcome"))
+GEN_POST = Histogram("bridge_generator_post_seconds",
+                     "Generator POST latency", ("path", "outcome"))
+TIME_TO_CALLBACK = Histogram("bridge_time_to_callback_seconds",
+                             "Time from enqueue to generator callback", ("type", "status"))
+KAFKA_DELIVERY = Histogram("bridge_kafka_delivery_seconds",
+                           "Time from produce() to delivery report", ("outcome",))
+JOB_ATTEMPTS = Histogram("bridge_job_attempts",
+                         "Generator attempts per job when it stops retrying", ("outcome",),
+                         buckets=(1, 2, 3, 4, 5, 6))
+RETRIES = Counter("bridge_job_retries_total", "Jobs rescheduled for retry")
@@ -0,0 +1,154 @@
+# scheduler.py
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from bridge import logs
+
+Handler = Callable[[int, Dict[str, Any]], Awaitable[None]]
+
+
+class JobScheduler:
+    """앱 이벤트 루프 위에서 도는 우선순위 잡 스케줄러.
+
+    - prio 값이 작을수록 먼저 (queue.PriorityQueue와 동일), 같은 prio는 FIFO
+    - max_inflight: 동시에 처리 중인 잡 수 상한 (잡 = 태스크, 스레드 아님)
+    - stage(name): 단계별(LLM, generator POST) 동시성 제한
+    - submit_later(): 재시도 대기는 슬롯을 잡지 않고 루프 타이머 힙에서 기다림
+    - cancel(requestId): 대기/재시도 대기 중이면 빼고, 처리 중이면 태스크 취소
+    """
+
+    def __init__(self, handler: Handler, max_inflight: int, stage_limits: Dict[str, int]):
+        self._handler = handler
+        self._max_inflight = max_inflight
+        self._stage_limits = dict(stage_limits)
+        self._seq = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stages: Dict[str, asyncio.Semaphore] = {}
+        self._stage_busy: Dict[str, int] = {name: 0 for name in stage_limits}
+        self._queued: set[str] = set()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancelled: set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._delayed: Dict[str, asyncio.TimerHandle] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # asyncio 객체는 만들어진 루프에 묶이므로 lifespan 안에서 start()
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(self._max_inflight)
+        self._stages = {name: asyncio.Semaphore(n) for name, n in self._stage_limits.items()}
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self) -> None:
+        for h in self._delayed.values():
+            h.cancel()
+        self._delayed.clear()
+        tasks = list(self._running.values())
+        if self._dispatcher:
+            tasks.append(self._dispatcher)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, prio: int, job: Dict[str, Any]) -> None:
+        # 워커 스레드(sweeper 등)에서 불려도 안전하도록 루프 밖이면 call_soon_threadsafe
+        item = (prio, next(self._seq), job)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._put(item)
+        else:
+            self._loop.call_soon_threadsafe(self._put, item)
+
+    def submit_later(self, prio: int, job: Dict[str, Any], delay_s: float) -> None:
+        # 루프 안(핸들러)에서만 호출. asyncio 타이머 힙이 next-attempt 시각 순으로 깨워줌
+        req_id = job["requestId"]
+        self._jobs[req_id] = job
+        self._delayed[req_id] = self._loop.call_later(delay_s, self._fire_delayed, prio, job)
+
+    def _fire_delayed(self, prio: int, job: Dict[str, Any]) -> None:
+        self._delayed.pop(job["requestId"], None)
+        self._put((prio, next(self._seq), job))
+
+    def _put(self, item: tuple) -> None:
+        req_id = item[2]["requestId"]
+        self._cancelled.discard(req_id)
+        self._queued.add(req_id)
+        self._jobs[req_id] = item[2]
+        self._queue.put_nowait(item)
+
+    def cancel(self, req_id: str) -> Optional[Dict[str, Any]]:
+        # 취소된 잡을 돌려준다 (대기/처리 중이 아니면 None)
+        job = self._jobs.get(req_id)
+        task = self._running.get(req_id)
+        if task is not None:
+            task.cancel()
+            return job
+        handle = self._delayed.pop(req_id, None)
+        if handle is not None:
+            handle.cancel()
+            self._jobs.pop(req_id, None)
+            return job
+        if req_id in self._queued:
+            self._queued.discard(req_id)
+            self._cancelled.add(req_id)
+            self._jobs.pop(req_id, None)
+            return job
+        return None
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        sem = self._stages.get(name)
+        if sem is None:
+            yield
+            return
+        async with sem:
+            self._stage_busy[name] += 1
+            try:
+                yield
+            finally:
+                self._stage_busy[name] -= 1
+
+    async def _dispatch(self) -> None:
+        while True:
+            # 슬롯을 먼저 확보한 뒤 꺼내야 그 사이 들어온 높은 우선순위 잡이 앞선다
+            await self._slots.acquire()
+            prio, _, job = await self._queue.get()
+            req_id = job["requestId"]
+            if req_id in self._cancelled:
+                self._cancelled.discard(req_id)
+                self._slots.release()
+                continue
+            self._queued.discard(req_id)
+            self._running[req_id] = asyncio.create_task(self._run(prio, job))
+
+    async def _run(self, prio: int, job: Dict[str, Any]) -> None:
+        req_id = job["requestId"]
+        try:
+            await self._handler(prio, job)
+        except asyncio.CancelledError:
+            logs.info("sched_cancelled", requestId=req_id)
+        except Exception as e:
+            logs.error("sched_job_crashed", str(e), requestId=req_id)
+        finally:
+            # 핸들러가 스스로 재등록한 경우 새 태스크 항목은 남겨둔다
+            if self._running.get(req_id) is asyncio.current_task():
+                del self._running[req_id]
+                if req_id not in self._queued and req_id not in self._delayed:
+                    self._jobs.pop(req_id, None)
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "retrying": len(self._delayed),
+            "stages": dict(self._stage_busy),
+        }
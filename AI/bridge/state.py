@@ -0,0 +1,116 @@
+# state.py
+import heapq
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+HEAP_COMPACT_SLACK = 64   # 이보다 작은 힙은 재구성하지 않음
+
+
+class _Shard:
+    __slots__ = ("data", "heap", "lock")
+
+    def __init__(self):
+        self.data: Dict[str, Dict[str, Any]] = {}
+        # (deadline, requestId) 최소 힙. 끝난 잡은 지우지 않고 꺼낼 때 건너뜀(lazy delete)
+        self.heap: list[tuple[datetime, str]] = []
+        self.lock = threading.Lock()
+
+    def is_stale(self, deadline: datetime, req_id: str) -> bool:
+        info = self.data.get(req_id)
+        return info is None or info["deadline"] != deadline
+
+    def compact(self) -> None:
+        # 끝난 잡 항목이 살아 있는 잡보다 많아지면 힙을 다시 만든다 → 힙 크기가 TTL × 처리량이 아니라 inflight 수를 따라감
+        if len(self.heap) > 2 * len(self.data) + HEAP_COMPACT_SLACK:
+            self.heap = [(info["deadline"], rid) for rid, info in self.data.items()]
+            heapq.heapify(self.heap)
+
+
+class JobStateStore:
+    """브리지의 inflight 잡 상태 + 마감 힙 + 카운터.
+
+    전역 락 하나 대신 requestId 해시로 나눈 샤드마다 dict/마감 힙/락을 따로 둔다.
+    워커/콜백/sweeper가 서로 다른 잡을 만질 때는 경합하지 않고,
+    락을 잡는 구간은 dict/힙 연산 하나뿐이라 이벤트 루프에서 불러도 멈추지 않는다.
+    sweeper는 샤드별 힙 top을 모아(merge) 가장 이른 마감을 본다.
+    """
+
+    def __init__(self, shards: int = 16):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._counters: Dict[str, int] = {}
+        self._counter_lock = threading.Lock()
+
+    def _shard(self, req_id: str) -> _Shard:
+        return self._shards[zlib.crc32(req_id.encode()) % len(self._shards)]
+
+    def register(self, req_id: str, info: Dict[str, Any]) -> None:
+        sh = self._shard(req_id)
+        with sh.lock:
+            sh.data[req_id] = info
+            heapq.heappush(sh.heap, (info["deadline"], req_id))
+
+    def get(self, req_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if req_id is None:
+            return None
+        sh = self._shard(req_id)
+        with sh.lock:
+            return sh.data.get(req_id)
+
+    def update(self, req_id: str, **fields: Any) -> None:
+        sh = self._shard(req_id)
+        with sh.lock:
+            info = sh.data.get(req_id)
+            if info is not None:
+                info.update(fields)
+
+    def pop(self, req_id: Optional[str], deadline: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        # deadline을 주면 그 마감으로 등록된 항목일 때만 꺼냄 (재등록된 잡 보호)
+        if req_id is None:
+            return None
+        sh = self._shard(req_id)
+        with sh.lock:
+            info = sh.data.get(req_id)
+            if info is None or (deadline is not None and info["deadline"] != deadline):
+                return None
+            del sh.data[req_id]
+            sh.compact()
+            return info
+
+    def next_deadline(self) -> Optional[datetime]:
+        earliest: Optional[datetime] = None
+        for sh in self._shards:
+            with sh.lock:
+                # top에 쌓인 끝난 잡 항목은 여기서 버려 sweeper가 헛깨지 않게
+                while sh.heap and sh.is_stale(*sh.heap[0]):
+                    heapq.heappop(sh.heap)
+                if sh.heap and (earliest is None or sh.heap[0][0] < earliest):
+                    earliest = sh.heap[0][0]
+        return earliest
+
+    def pop_expired(self, now: datetime) -> list[tuple[str, Dict[str, Any]]]:
+        # 샤드별로 힙 top부터 마감이 지난 것만 꺼낸 뒤 마감 순으로 합침: 잡 하나당 O(log n)
+        due: list[tuple[datetime, str, Dict[str, Any]]] = []
+        for sh in self._shards:
+            with sh.lock:
+                while sh.heap and sh.heap[0][0] <= now:
+                    deadline, req_id = heapq.heappop(sh.heap)
+                    if not sh.is_stale(deadline, req_id):
+                        due.append((deadline, req_id, sh.data.pop(req_id)))
+        due.sort(key=lambda d: d[0])
+        return [(req_id, info) for _, req_id, info in due]
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._counter_lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def counter(self, name: str) -> int:
+        with self._counter_lock:
+            return self._counters.get(name, 0)
+
+    def __len__(self) -> int:
+        return sum(len(sh.data) for sh in self._shards)
+
+    def heap_size(self) -> int:
+        return sum(len(sh.heap) for sh in self._shards)